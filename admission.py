@@ -0,0 +1,137 @@
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+
+from fastapi import HTTPException, status
+
+from security import PASSWORD_HASH_WORKERS
+
+# Concurrent bcrypt verifications allowed on this worker before logins queue
+LOGIN_MAX_CONCURRENT = int(os.getenv("LOGIN_MAX_CONCURRENT", str(PASSWORD_HASH_WORKERS)))
+# Logins allowed to wait for a verification slot; beyond this they are shed
+LOGIN_MAX_QUEUE = int(os.getenv("LOGIN_MAX_QUEUE", "16"))
+LOGIN_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LOGIN_QUEUE_TIMEOUT_SECONDS", "2"))
+# Sliding-window attempt limits, checked before any lookup or hash
+LOGIN_WINDOW_SECONDS = float(os.getenv("LOGIN_WINDOW_SECONDS", "60"))
+LOGIN_LIMIT_PER_USERNAME = int(os.getenv("LOGIN_LIMIT_PER_USERNAME", "10"))
+LOGIN_LIMIT_PER_IP = int(os.getenv("LOGIN_LIMIT_PER_IP", "30"))
+# Upper bound on tracked usernames/IPs so a spray of new keys cannot grow memory
+LOGIN_LIMITER_MAX_KEYS = int(os.getenv("LOGIN_LIMITER_MAX_KEYS", "100000"))
+
+
+class SlidingWindowLimiter:
+    """Allows at most ``limit`` hits per key within the last ``window`` seconds"""
+
+    def __init__(self, limit: int, window: float, max_keys: int = LOGIN_LIMITER_MAX_KEYS):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self.rejected = 0
+        self._hits = OrderedDict()
+
+    def hit(self, key) -> float:
+        """Record a hit; return 0 when allowed, otherwise seconds until the next one is"""
+        now = time.monotonic()
+        hits = self._hits.get(key)
+        if hits is None:
+            hits = self._hits[key] = deque()
+            while len(self._hits) > self.max_keys:
+                self._hits.popitem(last=False)
+        else:
+            self._hits.move_to_end(key)
+
+        while hits and hits[0] <= now - self.window:
+            hits.popleft()
+        if len(hits) >= self.limit:
+            self.rejected += 1
+            return hits[0] + self.window - now
+        hits.append(now)
+        return 0.0
+
+    def tracked_keys(self) -> int:
+        return len(self._hits)
+
+
+class LoginAdmission:
+    """Admission control that keeps a login burst from monopolising the CPU.
+
+    Attempts are first rate limited per username and per IP. Admitted
+    attempts then need one of a bounded number of verification slots; a
+    short queue absorbs spikes and anything beyond it is shed with a 503.
+    """
+
+    def __init__(self, max_concurrent: int = LOGIN_MAX_CONCURRENT, max_queue: int = LOGIN_MAX_QUEUE,
+                 queue_timeout: float = LOGIN_QUEUE_TIMEOUT_SECONDS):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.by_username = SlidingWindowLimiter(LOGIN_LIMIT_PER_USERNAME, LOGIN_WINDOW_SECONDS)
+        self.by_ip = SlidingWindowLimiter(LOGIN_LIMIT_PER_IP, LOGIN_WINDOW_SECONDS)
+        self.in_flight = 0
+        self.queue_depth = 0
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+
+    def check_rate(self, username: str, ip: str):
+        """Reject with 429 before any database lookup or hash is spent on the attempt"""
+        retry_after = self.by_ip.hit(ip) or self.by_username.hit(username.lower())
+        if retry_after:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many login attempts, try again later",
+                headers={"Retry-After": str(math.ceil(retry_after))}
+            )
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold a verification slot, waiting briefly in a bounded queue"""
+        if self.in_flight + self.queue_depth >= self.max_concurrent + self.max_queue:
+            self.shed_queue_full += 1
+            raise self._overloaded()
+
+        self.queue_depth += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.shed_timeout += 1
+            raise self._overloaded()
+        finally:
+            self.queue_depth -= 1
+
+        self.admitted += 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def _overloaded(self):
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Login service is busy, try again shortly",
+            headers={"Retry-After": "1"}
+        )
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "admitted": self.admitted,
+            "shed_queue_full": self.shed_queue_full,
+            "shed_timeout": self.shed_timeout,
+            "rate_limited_username": self.by_username.rejected,
+            "rate_limited_ip": self.by_ip.rejected,
+            "tracked_usernames": self.by_username.tracked_keys(),
+            "tracked_ips": self.by_ip.tracked_keys(),
+        }
+
+
+login_admission = LoginAdmission()
@@ -1,6 +1,13 @@
+import hashlib
+import hmac
+import time
 from datetime import datetime, timedelta
+from uuid import uuid4
 from jose import jwt, JWTError
 from database import get_database
+from cache import token_cache
+from revocation import revocations
+from tracing import span
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 import os
@@ -9,6 +16,9 @@ import os
 SECRET_KEY = os.getenv("SECRET_KEY", "BANK_SECRET_KEY_123")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+# Static bearer token a Prometheus scraper can read /metrics with; unset, only admins can
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
 
 # Validate SECRET_KEY is not None or empty
 if not SECRET_KEY:
@@ -19,12 +29,47 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
 
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=15))
-    to_encode.update({"exp": expire})
+    # jti lets a single token be revoked
+    to_encode.update({"exp": expire, "jti": uuid4().hex, "type": "access"})
 
     token = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return token
 
 
+def create_refresh_token(data: dict, expires_delta: timedelta | None = None):
+    """Long-lived token that can only be exchanged for a new token pair at /refresh"""
+    to_encode = data.copy()
+
+    expire = datetime.utcnow() + (expires_delta or timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
+    to_encode.update({"exp": expire, "jti": uuid4().hex, "type": "refresh"})
+
+    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+
+def decode_refresh_token(token: str) -> dict:
+    """Verify a refresh token and return its claims"""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+
+    if payload.get("type") != "refresh" or not payload.get("jti") or payload.get("user_id") is None:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    return payload
+
+
+def issue_token_pair(username: str, user_id: int, role: str) -> dict:
+    """Access token plus a rotating refresh token, so renewal never needs the password"""
+    claims = {"sub": username, "user_id": user_id, "role": role}
+    return {
+        "access_token": create_access_token(
+            claims, expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        ),
+        "refresh_token": create_refresh_token(claims),
+        "token_type": "bearer"
+    }
+
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
 
@@ -52,26 +97,53 @@ def verify_access_token(token: str):
         )
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
+def decode_principal(token: str):
+    """Verify a bearer token and return ``(principal, exp, jti)``"""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username = payload.get("sub")
         user_id = payload.get("user_id")
         role = payload.get("role")
         
-        if username is None:
+        # Refresh tokens are only accepted by /refresh
+        if username is None or payload.get("type") == "refresh":
             raise HTTPException(status_code=401, detail="Invalid token")
             
         # Return user info without database lookup for performance
-        return {
+        principal = {
             "username": username,
             "user_id": int(user_id),
             "role": role
         }
+        return principal, payload.get("exp"), payload.get("jti")
     except JWTError as e:
         raise HTTPException(status_code=401, detail="Invalid token")
 
 
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    # Verified principals are cached under a hash of the token until the token expires;
+    # expired or invalid tokens are never cached, so they fail exactly as before
+    async def load():
+        return decode_principal(token)
+
+    with span("auth.get_current_user"):
+        principal, _, jti = await token_cache.get_or_load(
+            hashlib.sha256(token.encode()).digest(),
+            load,
+            ttl=lambda value: value[1] - time.time() if value[1] else 0
+        )
+        # In-memory filter check; only filter hits cost a database lookup
+        if jti and await revocations.is_revoked(jti):
+            raise HTTPException(status_code=401, detail="Token has been revoked")
+        return dict(principal)
+
+
+async def get_current_token_claims(token: str = Depends(oauth2_scheme)):
+    """Claims of the bearer token, for endpoints that act on the token itself"""
+    await get_current_user(token)
+    return jwt.get_unverified_claims(token)
+
+
 async def admin_only(current_user=Depends(get_current_user)):
     if current_user["role"] != "admin":
         raise HTTPException(
@@ -81,12 +153,32 @@ async def admin_only(current_user=Depends(get_current_user)):
     return current_user
 
 
+async def metrics_reader(token: str = Depends(oauth2_scheme)):
+    """The metrics scraper's static token, or an admin's access token"""
+    if METRICS_TOKEN and hmac.compare_digest(token.encode(), METRICS_TOKEN.encode()):
+        return {"role": "metrics"}
+    return await admin_only(await get_current_user(token))
+
+
 async def user_or_admin(current_user=Depends(get_current_user)):
     if current_user["role"] not in ["user", "admin"]:
         raise HTTPException(status_code=403, detail="Access denied")
     return current_user
 
 
+async def is_admin_request(scope) -> bool:
+    """Whether an ASGI request carries an admin's bearer token, for middleware outside routing"""
+    authorization = dict(scope["headers"]).get(b"authorization", b"").decode("latin-1")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        principal = await get_current_user(token)
+    except HTTPException:
+        return False
+    return principal.get("role") == "admin"
+
+
 async def user_only(current_user=Depends(get_current_user)):
     if current_user["role"] != "user":
         raise HTTPException(
@@ -0,0 +1,70 @@
+"""
+Benchmark bytes on the wire against compression CPU for typical API payloads.
+
+Covers gzip always, and brotli / zstd when those packages are installed.
+
+    python bench_compression.py
+"""
+
+import time
+from datetime import datetime
+
+from compression import ENCODERS, _compress_whole
+from responses import ACCOUNT, ACCOUNT_LIST, USER_LIST
+
+ITERATIONS = 20
+
+
+def account(i: int) -> dict:
+    return {
+        "acc_no": i,
+        "acc_holder_name": f"Holder {i}",
+        "acc_holder_address": f"{i} Bench Street, Pune",
+        "dob": "1990-01-01",
+        "gender": "Other",
+        "acc_type": "Savings" if i % 2 else "Current",
+        "balance": 1000.0 + i * 7.25,
+        "ifsc_code": 123456,
+        "branch": "Main Branch",
+        "created_at": datetime.utcnow(),
+        "user_id": i // 3,
+    }
+
+
+def user(i: int) -> dict:
+    return {
+        "user_id": i,
+        "username": f"user{i}",
+        "email": f"user{i}@example.com",
+        "mob_no": 9_000_000_000 + i,
+        "role": "user",
+        "created_at": datetime.utcnow(),
+        "accounts": [account(i * 3 + j) for j in range(3)],
+    }
+
+
+PAYLOADS = {
+    "GET /accounts/{id}": ACCOUNT.dump_json(account(1)),
+    "GET /accounts/ (100)": ACCOUNT_LIST.dump_json([account(i) for i in range(100)]),
+    "GET /accounts/ (5000)": ACCOUNT_LIST.dump_json([account(i) for i in range(5000)]),
+    "GET /users/ (1000)": USER_LIST.dump_json([user(i) for i in range(1000)]),
+}
+
+
+def main():
+    print(f"🏦 Compression benchmark ({ITERATIONS} iterations, encoders: {', '.join(ENCODERS)})")
+    print("=" * 50)
+    for name, body in PAYLOADS.items():
+        print(f"  {name:<22} identity {len(body):>9} bytes")
+        for encoding, encoder_class in ENCODERS.items():
+            compressed = _compress_whole(encoder_class, body)
+            started = time.process_time()
+            for _ in range(ITERATIONS):
+                _compress_whole(encoder_class, body)
+            cpu_ms = (time.process_time() - started) / ITERATIONS * 1000
+            print(f"  {'':<22} {encoding:<8} {len(compressed):>9} bytes  "
+                  f"ratio {len(body) / len(compressed):5.1f}x  CPU {cpu_ms:7.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark GET /accounts/{id} latency while a storm of logins runs on the same event loop.
+
+The account read goes through the real get_current_user dependency and
+accounts_repo.show with a warm cache, so no database is needed; the storm
+runs bcrypt verification inline (before) or on the hashing pool (after).
+
+    python bench_login_storm.py
+"""
+
+import asyncio
+import os
+import statistics
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("MONGODB_URL", "mongodb://localhost:27017")
+
+from auth import create_access_token, get_current_user
+from cache import account_cache
+from repository import accounts as accounts_repo
+from security import get_password_hash, verify_password, verify_password_async, shutdown_hash_executor
+
+LOGINS = 40
+LOGIN_CONCURRENCY = 8
+PROBE_INTERVAL = 0.005
+
+ACCOUNT = {
+    "acc_no": 1,
+    "acc_holder_name": "Bench Holder",
+    "acc_holder_address": "Bench Street",
+    "dob": "1990-01-01",
+    "gender": "Other",
+    "acc_type": "Savings",
+    "balance": 1000.0,
+    "ifsc_code": 123456,
+    "branch": "Main Branch",
+    "created_at": datetime.utcnow(),
+    "user_id": 1,
+}
+
+
+async def get_account(token: str):
+    """What the /accounts/{id} route does once the request is parsed"""
+    await get_current_user(token)
+    return await accounts_repo.show(ACCOUNT["acc_no"])
+
+
+async def run(offloaded: bool, hashed: str, token: str):
+    await account_cache.backend.set(ACCOUNT["acc_no"], ACCOUNT, ttl=3600)
+    latencies = []
+    storm_done = asyncio.Event()
+    queue = asyncio.Queue()
+    for _ in range(LOGINS):
+        queue.put_nowait(None)
+
+    async def login_worker():
+        while not queue.empty():
+            queue.get_nowait()
+            if offloaded:
+                await verify_password_async("password123", hashed)
+            else:
+                verify_password("password123", hashed)
+            await asyncio.sleep(0)
+
+    async def probe():
+        # A blocked loop delays the request before it starts, so time each one from when it was due
+        while not storm_done.is_set():
+            due = time.perf_counter() + PROBE_INTERVAL
+            await asyncio.sleep(PROBE_INTERVAL)
+            await get_account(token)
+            latencies.append(time.perf_counter() - due)
+
+    async def storm():
+        await asyncio.gather(*[login_worker() for _ in range(LOGIN_CONCURRENCY)])
+        storm_done.set()
+
+    probe_task = asyncio.create_task(probe())
+    started = time.perf_counter()
+    await storm()
+    elapsed = time.perf_counter() - started
+    await probe_task
+
+    latencies.sort()
+    label = "offloaded" if offloaded else "inline   "
+    print(f"  bcrypt {label}  Logins/s: {LOGINS / elapsed:6.1f}  "
+          f"Reads: {len(latencies):>5}  "
+          f"p50: {statistics.median(latencies) * 1000:8.2f} ms  "
+          f"p99: {latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1000:8.2f} ms  "
+          f"max: {latencies[-1] * 1000:8.2f} ms")
+
+
+async def main():
+    hashed = get_password_hash("password123")
+    token = create_access_token(
+        {"sub": "bench", "user_id": 1, "role": "user"},
+        expires_delta=timedelta(minutes=30)
+    )
+    print(f"🏦 Login storm benchmark ({LOGINS} logins, concurrency {LOGIN_CONCURRENCY})")
+    print("=" * 50)
+    await run(False, hashed, token)
+    await run(True, hashed, token)
+    shutdown_hash_executor()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
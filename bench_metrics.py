@@ -0,0 +1,88 @@
+"""
+Benchmark the per-request cost of recording metrics.
+
+Times the raw histogram/counter updates, the command listener, and a
+request through MetricsMiddleware against the same bare ASGI app without
+it. No database is needed.
+
+    python bench_metrics.py
+"""
+
+import asyncio
+import os
+import time
+from datetime import timedelta
+
+os.environ.setdefault("MONGODB_URL", "mongodb://localhost:27017")
+
+from pymongo import monitoring
+
+import metrics
+
+ITERATIONS = 200_000
+
+
+class Route:
+    path = "/accounts/{id}"
+
+
+async def bare_app(scope, receive, send):
+    scope["route"] = Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def noop_send(message):
+    pass
+
+
+async def noop_receive():
+    return {"type": "http.request"}
+
+
+def per_call_us(function, iterations=ITERATIONS) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+async def per_request_us(app, iterations=ITERATIONS) -> float:
+    scope = {"type": "http", "method": "GET", "path": "/accounts/1", "headers": []}
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await app(dict(scope), noop_receive, noop_send)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def listener_round_trip():
+    listener = metrics.CommandMetricsListener()
+    started = monitoring.CommandStartedEvent(
+        {"find": "accounts", "filter": {"acc_no": 1}}, "bank_system", 1, ("localhost", 27017), 1
+    )
+    succeeded = monitoring.CommandSucceededEvent(
+        timedelta(microseconds=850), {"ok": 1}, "find", 1, ("localhost", 27017), 1
+    )
+
+    def round_trip():
+        listener.started(started)
+        listener.succeeded(succeeded)
+    return round_trip
+
+
+async def main():
+    print(f"🏦 Metrics overhead benchmark ({ITERATIONS} iterations)")
+    print("=" * 50)
+    print(f"  Histogram.observe           {per_call_us(lambda: metrics.http_request_duration.observe(0.004, 'GET', '/accounts/{id}')):6.2f} µs")
+    print(f"  Counter.inc                 {per_call_us(lambda: metrics.http_requests.inc('GET', '/accounts/{id}', 200)):6.2f} µs")
+    print(f"  Command listener round trip {per_call_us(listener_round_trip()):6.2f} µs")
+
+    bare = await per_request_us(bare_app)
+    instrumented = await per_request_us(metrics.MetricsMiddleware(bare_app))
+    print(f"  Request without middleware  {bare:6.2f} µs")
+    print(f"  Request with middleware     {instrumented:6.2f} µs  (+{instrumented - bare:.2f} µs)")
+    print(f"  /metrics render             {per_call_us(metrics.render, 1000):6.1f} µs")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
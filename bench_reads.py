@@ -0,0 +1,85 @@
+"""
+Benchmark per-request CPU of the raw-driver read path against the Beanie ODM path.
+
+Both paths end with the same response validation FastAPI performs, so the
+difference is the cost of hydrating Document instances and calling .dict().
+
+    MONGODB_URL="mongodb://localhost:27017" python bench_reads.py
+"""
+
+import asyncio
+import sys
+import time
+from typing import List
+
+from pydantic import TypeAdapter
+
+from database import init_db
+from models import Accounts, Users
+from repository import accounts as accounts_repo
+from repository import users as users_repo
+from schemas import ShowAccount, ShowUser
+
+ITERATIONS = 50
+
+account_list = TypeAdapter(List[ShowAccount])
+user_list = TypeAdapter(List[ShowUser])
+
+
+async def odm_accounts():
+    accounts = await Accounts.find_all().to_list()
+    return account_list.validate_python([account.dict() for account in accounts])
+
+
+async def fast_accounts():
+    accounts, _ = await accounts_repo.get_all()
+    return account_list.validate_python(accounts)
+
+
+async def odm_users():
+    users = await Users.find_all().to_list()
+    result = []
+    for user in users:
+        accounts = await Accounts.find(Accounts.user_id == user.user_id).to_list()
+        user_dict = user.dict()
+        user_dict["accounts"] = [account.dict() for account in accounts]
+        result.append(user_dict)
+    return user_list.validate_python(result)
+
+
+async def fast_users():
+    users, _ = await users_repo.get_all_users()
+    return user_list.validate_python(users)
+
+
+async def cpu_per_request(call) -> float:
+    await call()  # Warm up
+    started = time.process_time()
+    for _ in range(ITERATIONS):
+        await call()
+    return (time.process_time() - started) / ITERATIONS * 1000
+
+
+async def main():
+    await init_db()
+    accounts = await Accounts.count()
+    users = await Users.count()
+    print(f"🏦 Read path benchmark ({accounts} accounts, {users} users, {ITERATIONS} iterations)")
+    print("=" * 50)
+
+    for name, odm, fast in (
+        ("GET /accounts/", odm_accounts, fast_accounts),
+        ("GET /users/", odm_users, fast_users),
+    ):
+        odm_ms = await cpu_per_request(odm)
+        fast_ms = await cpu_per_request(fast)
+        print(f"  {name:<16} ODM: {odm_ms:8.2f} ms CPU  Raw: {fast_ms:8.2f} ms CPU  "
+              f"Speedup: {odm_ms / fast_ms:5.1f}x")
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except Exception as e:
+        print(f"❌ Benchmark failed: {e}")
+        sys.exit(1)
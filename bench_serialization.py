@@ -0,0 +1,81 @@
+"""
+Benchmark response serialization of List[ShowAccount] with 10k items.
+
+Compares FastAPI's default response_model path, the same path rendered with
+ORJSONResponse, and the single-pass model_response used by the routers.
+
+    python bench_serialization.py
+"""
+
+import json
+import time
+from datetime import datetime
+
+import orjson
+from fastapi.responses import ORJSONResponse
+
+from responses import ACCOUNT_LIST, model_response
+
+ITEMS = 10_000
+ITERATIONS = 20
+
+ACCOUNTS = [
+    {
+        "acc_no": i,
+        "acc_holder_name": f"Holder {i}",
+        "acc_holder_address": f"{i} Bench Street",
+        "dob": "1990-01-01",
+        "gender": "Other",
+        "acc_type": "Savings",
+        "balance": 1000.0 + i,
+        "ifsc_code": 123456,
+        "branch": "Main Branch",
+        "created_at": datetime.utcnow(),
+        "user_id": i // 3,
+    }
+    for i in range(ITEMS)
+]
+
+
+def default_path():
+    """response_model validation, dump to JSON-compatible Python, stdlib json"""
+    content = ACCOUNT_LIST.dump_python(ACCOUNT_LIST.validate_python(ACCOUNTS), mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+def orjson_path():
+    """Same as default_path but rendered by ORJSONResponse"""
+    content = ACCOUNT_LIST.dump_python(ACCOUNT_LIST.validate_python(ACCOUNTS), mode="json")
+    return ORJSONResponse(content).body
+
+
+def single_pass_path():
+    """Validate once and encode straight to JSON bytes"""
+    return model_response(ACCOUNT_LIST, ACCOUNTS).body
+
+
+def per_call_ms(call) -> float:
+    call()  # Warm up
+    started = time.perf_counter()
+    for _ in range(ITERATIONS):
+        call()
+    return (time.perf_counter() - started) / ITERATIONS * 1000
+
+
+def main():
+    print(f"🏦 Serialization benchmark (List[ShowAccount], {ITEMS} items, {ITERATIONS} iterations)")
+    print("=" * 50)
+    assert orjson.loads(default_path()) == orjson.loads(single_pass_path())
+
+    baseline = per_call_ms(default_path)
+    for name, call in (
+        ("default json", default_path),
+        ("ORJSONResponse", orjson_path),
+        ("single pass", single_pass_path),
+    ):
+        elapsed = per_call_ms(call)
+        print(f"  {name:<15} {elapsed:8.2f} ms  ({baseline / elapsed:4.1f}x)  {len(call()):>9} bytes")
+
+
+if __name__ == "__main__":
+    main()
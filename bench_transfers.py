@@ -0,0 +1,106 @@
+"""
+Benchmark transfer throughput under contention.
+
+Multi-document transactions need a replica set. For a local single-node one:
+
+    mongod --replSet rs0 --dbpath /tmp/rs0 --port 27017
+    mongosh --eval "rs.initiate()"
+    MONGODB_URL="mongodb://localhost:27017/?replicaSet=rs0" python bench_transfers.py
+"""
+
+import asyncio
+import random
+import statistics
+import sys
+import time
+
+from fastapi import HTTPException
+
+from database import init_db
+from journal import journal
+from models import Accounts, Transactions
+from repository import accounts as accounts_repo
+
+# Benchmark accounts live far above real account numbers and are removed afterwards
+BASE_ACC_NO = 9_000_000
+TRANSFERS = 2000
+CONCURRENCY = 32
+# Owner of every benchmark account, so transfers go through the ownership check
+BENCH_USER = {"user_id": 0, "role": "user"}
+
+
+async def create_accounts(count: int):
+    await Accounts.find(Accounts.acc_no >= BASE_ACC_NO).delete()
+    await Accounts.insert_many([
+        Accounts(
+            acc_no=BASE_ACC_NO + i,
+            acc_holder_name=f"Bench {i}",
+            acc_holder_address="Bench Street",
+            dob="1990-01-01",
+            gender="Other",
+            acc_type="Savings",
+            balance=1_000_000.0,
+            user_id=0
+        )
+        for i in range(count)
+    ])
+
+
+async def run(hot_accounts: int):
+    """Run TRANSFERS random transfers among hot_accounts accounts"""
+    await create_accounts(hot_accounts)
+    latencies = []
+    failures = 0
+    queue = asyncio.Queue()
+    for _ in range(TRANSFERS):
+        source, target = random.sample(range(hot_accounts), 2)
+        queue.put_nowait((BASE_ACC_NO + source, BASE_ACC_NO + target))
+
+    async def worker():
+        nonlocal failures
+        while not queue.empty():
+            source, target = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                await accounts_repo.transfer(source, target, 1.0, BENCH_USER)
+            except HTTPException:
+                failures += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(CONCURRENCY)])
+    elapsed = time.perf_counter() - started
+
+    accounts = await Accounts.find(Accounts.acc_no >= BASE_ACC_NO).to_list()
+    total = sum(account.balance for account in accounts)
+    expected = hot_accounts * 1_000_000.0
+    latencies.sort()
+
+    print(f"  Accounts: {hot_accounts:>4}  "
+          f"Throughput: {TRANSFERS / elapsed:8.1f} transfers/s  "
+          f"p50: {statistics.median(latencies) * 1000:6.1f} ms  "
+          f"p99: {latencies[int(len(latencies) * 0.99) - 1] * 1000:6.1f} ms  "
+          f"Failures: {failures}")
+    if total != expected:
+        print(f"  ❌ Money was created or lost: {total} != {expected}")
+
+    await journal.flush()
+    await Accounts.find(Accounts.acc_no >= BASE_ACC_NO).delete()
+    await Transactions.find(Transactions.acc_no >= BASE_ACC_NO).delete()
+
+
+async def main():
+    await init_db()
+    print(f"🏦 Transfer benchmark ({TRANSFERS} transfers, concurrency {CONCURRENCY})")
+    print("=" * 50)
+    # Fewer accounts means more transactions fighting over the same documents
+    for hot_accounts in (2, 4, 16, 256):
+        await run(hot_accounts)
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except Exception as e:
+        print(f"❌ Benchmark failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,151 @@
+import os
+import time
+from collections import OrderedDict
+
+# Per-worker read cache settings; entries also expire so other workers' writes show up
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "5"))
+ACCOUNT_CACHE_SIZE = int(os.getenv("ACCOUNT_CACHE_SIZE", "10000"))
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "10000"))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+
+class CacheBackend:
+    """Storage interface for ReadThroughCache.
+
+    Methods are async so a shared store (e.g. Redis) can be dropped in
+    without changing callers.
+    """
+
+    async def get(self, key):
+        """Return the stored value or ``None`` when absent or expired"""
+        raise NotImplementedError
+
+    async def set(self, key, value, ttl: float):
+        raise NotImplementedError
+
+    async def delete(self, key):
+        raise NotImplementedError
+
+    async def clear(self):
+        raise NotImplementedError
+
+    def size(self) -> int:
+        raise NotImplementedError
+
+
+class MemoryLRUBackend(CacheBackend):
+    """Bounded in-process store with LRU eviction and per-entry expiry"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    async def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key, value, ttl: float):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def delete(self, key):
+        self._entries.pop(key, None)
+
+    async def clear(self):
+        self._entries.clear()
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class ReadThroughCache:
+    """Read-through cache with explicit invalidation and hit/miss counters"""
+
+    def __init__(self, name: str, backend: CacheBackend, ttl: float = CACHE_TTL_SECONDS):
+        self.name = name
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # Bumped by clear(); together with the per-key generation it detects stale loads
+        self._epoch = 0
+        # key -> [loads in flight, invalidations seen while loading]; keys leave when their loads finish
+        self._loading = {}
+        caches[name] = self
+
+    async def get_or_load(self, key, loader, ttl=None):
+        """Return the cached value for key, calling ``loader()`` on a miss.
+
+        ``ttl`` overrides the cache default; it may be a callable that derives
+        the lifetime from the loaded value. Non-positive lifetimes are not stored.
+        """
+        value = await self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        # A write to this key that lands while we load must not be overwritten by the stale result
+        loading = self._loading.setdefault(key, [0, 0])
+        loading[0] += 1
+        seen = (self._epoch, loading[1])
+        try:
+            value = await loader()
+        finally:
+            loading[0] -= 1
+            if not loading[0]:
+                del self._loading[key]
+        lifetime = self.ttl if ttl is None else ttl(value) if callable(ttl) else ttl
+        if seen == (self._epoch, loading[1]) and lifetime > 0:
+            await self.backend.set(key, value, lifetime)
+        return value
+
+    async def peek(self, key):
+        """Return the cached value for key without loading it on a miss; counted like a lookup"""
+        value = await self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return value
+
+    async def invalidate(self, *keys):
+        for key in keys:
+            loading = self._loading.get(key)
+            if loading is not None:
+                loading[1] += 1
+            await self.backend.delete(key)
+
+    async def clear(self):
+        self._epoch += 1
+        await self.backend.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "size": self.backend.size(),
+            "max_size": getattr(self.backend, "max_size", None),
+            "evictions": getattr(self.backend, "evictions", None),
+            "ttl_seconds": self.ttl,
+        }
+
+
+caches = {}
+
+account_cache = ReadThroughCache("accounts", MemoryLRUBackend(ACCOUNT_CACHE_SIZE))
+profile_cache = ReadThroughCache("profiles", MemoryLRUBackend(PROFILE_CACHE_SIZE))
+token_cache = ReadThroughCache("tokens", MemoryLRUBackend(TOKEN_CACHE_SIZE))
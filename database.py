@@ -1,8 +1,13 @@
 import motor.motor_asyncio
 from beanie import init_beanie
+import importlib.util
 import os
 from dotenv import load_dotenv
 
+from metrics import CommandMetricsListener, PoolMetricsListener
+from querylog import QueryLogListener
+from tracing import TracingCommandListener
+
 # Load environment variables
 load_dotenv()
 
@@ -13,19 +18,97 @@ DATABASE_NAME = os.getenv("DATABASE_NAME", "bank_system")
 if not MONGODB_URL:
     raise ValueError("MONGODB_URL environment variable is required")
 
-# Create MongoDB client
-client = motor.motor_asyncio.AsyncIOMotorClient(MONGODB_URL)
+# Client tuning; anything left unset keeps the driver default or whatever MONGODB_URL specifies.
+# With many workers, keep MONGODB_MAX_POOL_SIZE x workers under the server's connection limit and
+# a low MONGODB_MAX_CONNECTING so a deploy does not open every connection at once.
+CLIENT_SETTINGS = {
+    "maxPoolSize": "MONGODB_MAX_POOL_SIZE",
+    "minPoolSize": "MONGODB_MIN_POOL_SIZE",
+    "maxConnecting": "MONGODB_MAX_CONNECTING",
+    "waitQueueTimeoutMS": "MONGODB_WAIT_QUEUE_TIMEOUT_MS",
+    "serverSelectionTimeoutMS": "MONGODB_SERVER_SELECTION_TIMEOUT_MS",
+    # Per-operation time budget; the driver also sends it to the server as maxTimeMS
+    "timeoutMS": "MONGODB_TIMEOUT_MS",
+    "zlibCompressionLevel": "MONGODB_ZLIB_COMPRESSION_LEVEL",
+}
+# Wire compression in order of preference, e.g. "zstd,snappy,zlib"
+MONGODB_COMPRESSORS = os.getenv("MONGODB_COMPRESSORS", "")
+
+# Compressors and the module each one needs
+COMPRESSOR_MODULES = {"zstd": "zstandard", "snappy": "snappy", "zlib": "zlib"}
+
+
+def available_compressors(requested: str):
+    """Requested compressors whose module is installed; the rest are reported and skipped"""
+    compressors = []
+    for name in filter(None, (part.strip().lower() for part in requested.split(","))):
+        module = COMPRESSOR_MODULES.get(name)
+        if module is None:
+            print(f"⚠️  Unknown MongoDB compressor '{name}' ignored")
+        elif importlib.util.find_spec(module) is None:
+            print(f"⚠️  MongoDB compressor '{name}' needs the '{module}' package; skipped")
+        else:
+            compressors.append(name)
+    return compressors
+
+
+def client_options() -> dict:
+    options = {}
+    for option, variable in CLIENT_SETTINGS.items():
+        value = os.getenv(variable)
+        if value:
+            options[option] = int(value)
+    compressors = available_compressors(MONGODB_COMPRESSORS)
+    if compressors:
+        options["compressors"] = ",".join(compressors)
+    return options
+
+
+CLIENT_OPTIONS = client_options()
+
+# Create MongoDB client; the listeners feed /metrics, the slow-query log, per-request DB stats and traces
+client = motor.motor_asyncio.AsyncIOMotorClient(
+    MONGODB_URL,
+    **CLIENT_OPTIONS,
+    event_listeners=[
+        CommandMetricsListener(), PoolMetricsListener(), QueryLogListener(), TracingCommandListener()
+    ]
+)
 database = client[DATABASE_NAME]
 
 async def init_db():
     """Initialize database with Beanie ODM"""
-    from models import Users, Accounts
+    from models import Users, Accounts, Counter, Transactions, RevokedTokens
     
     await init_beanie(
         database=database,
-        document_models=[Users, Accounts]
+        document_models=[Users, Accounts, Counter, Transactions, RevokedTokens]
     )
 
 def get_database():
     """Get database instance"""
     return database
+
+
+def get_collection(document_model):
+    """Get the raw motor collection behind a Beanie document model"""
+    return database[document_model.Settings.name]
+
+
+def client_settings() -> dict:
+    """Effective client configuration, after environment overrides and driver defaults"""
+    def milliseconds(seconds):
+        return None if seconds is None else int(seconds * 1000)
+
+    pool = client.options.pool_options
+    return {
+        "database": DATABASE_NAME,
+        "max_pool_size": pool.max_pool_size,
+        "min_pool_size": pool.min_pool_size,
+        "max_connecting": pool.max_connecting,
+        "wait_queue_timeout_ms": milliseconds(pool.wait_queue_timeout),
+        "server_selection_timeout_ms": milliseconds(client.options.server_selection_timeout),
+        "timeout_ms": milliseconds(client.options.timeout),
+        "compressors": CLIENT_OPTIONS["compressors"].split(",") if "compressors" in CLIENT_OPTIONS else [],
+        "set_from_environment": sorted(CLIENT_OPTIONS),
+    }
@@ -0,0 +1,48 @@
+import hashlib
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+from responses import model_response
+
+# Authenticated, per-user data: clients may keep a copy but must revalidate it every time
+CACHE_CONTROL = "private, no-cache"
+
+
+def account_etag(account: dict) -> str:
+    """Weak ETag for an account document carrying acc_no and version"""
+    return f'W/"a{account["acc_no"]}.{account.get("version", 0)}"'
+
+
+def user_etag(user: dict) -> str:
+    """Weak ETag for a user document and the versions of the accounts joined into it"""
+    accounts = ",".join(f'{account["acc_no"]}.{account.get("version", 0)}' for account in user["accounts"])
+    digest = hashlib.blake2b(accounts.encode(), digest_size=8).hexdigest()
+    return f'W/"u{user["user_id"]}.{user.get("version", 0)}-{digest}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an ETag against an If-None-Match header"""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+
+async def conditional_response(request: Request, adapter: TypeAdapter, etag_of, load, load_stamp) -> Response:
+    """Answer If-None-Match from a version probe, or send the full body with its ETag.
+
+    ``load_stamp()`` returns just enough of the document to compute its ETag
+    (or ``None`` when it does not exist), so an unchanged resource costs a
+    tiny lookup and no serialization. ``load()`` returns the full document.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        stamp = await load_stamp()
+        if stamp is not None:
+            etag = etag_of(stamp)
+            if etag_matches(if_none_match, etag):
+                return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+    data = await load()
+    return model_response(adapter, data, headers={"ETag": etag_of(data), "Cache-Control": CACHE_CONTROL})
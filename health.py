@@ -0,0 +1,121 @@
+import asyncio
+import os
+import time
+from datetime import datetime
+
+import metrics
+from database import client, get_database
+from loop_monitor import loop_monitor
+
+# How often the background task pings MongoDB; probes only read the cached result
+HEALTH_PING_INTERVAL_SECONDS = float(os.getenv("HEALTH_PING_INTERVAL_SECONDS", "5"))
+HEALTH_PING_TIMEOUT_SECONDS = float(os.getenv("HEALTH_PING_TIMEOUT_SECONDS", "2"))
+# Readiness fails once the last successful ping is older than this
+HEALTH_MAX_PING_AGE_SECONDS = float(
+    os.getenv("HEALTH_MAX_PING_AGE_SECONDS", str(HEALTH_PING_INTERVAL_SECONDS * 3))
+)
+# Overload limits: past these the instance reports not ready so it drains before it fails
+READINESS_MAX_LOOP_LAG_MS = float(os.getenv("READINESS_MAX_LOOP_LAG_MS", "500"))
+READINESS_MAX_POOL_UTILIZATION = float(os.getenv("READINESS_MAX_POOL_UTILIZATION", "0.95"))
+READINESS_MAX_POOL_WAITING = int(os.getenv("READINESS_MAX_POOL_WAITING", "50"))
+
+
+class DatabaseHealth:
+    """MongoDB reachability from a periodic background ping.
+
+    Probes read the cached result, so however often the load balancer asks,
+    the database sees one ping per interval from each worker.
+    """
+
+    def __init__(self, interval: float = HEALTH_PING_INTERVAL_SECONDS,
+                 timeout: float = HEALTH_PING_TIMEOUT_SECONDS):
+        self.interval = interval
+        self.timeout = timeout
+        self.ok = False
+        self.last_checked = None
+        self.last_success = None
+        self.last_latency_ms = None
+        self.last_error = None
+        self.consecutive_failures = 0
+
+    async def check(self):
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(get_database().command("ping"), self.timeout)
+        except Exception as e:
+            self.ok = False
+            self.consecutive_failures += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+        else:
+            self.ok = True
+            self.consecutive_failures = 0
+            self.last_error = None
+            self.last_success = time.monotonic()
+            self.last_latency_ms = round((time.monotonic() - started) * 1000, 2)
+        self.last_checked = datetime.utcnow()
+
+    async def run(self):
+        """Background task refreshing the cached ping result"""
+        while True:
+            await self.check()
+            await asyncio.sleep(self.interval)
+
+    def ping_age(self):
+        return None if self.last_success is None else time.monotonic() - self.last_success
+
+    def stats(self) -> dict:
+        age = self.ping_age()
+        return {
+            "connected": self.ok,
+            "last_checked": self.last_checked,
+            "last_success_age_seconds": None if age is None else round(age, 1),
+            "last_latency_ms": self.last_latency_ms,
+            "consecutive_failures": self.consecutive_failures,
+            "last_error": self.last_error,
+        }
+
+
+def pool_stats() -> dict:
+    """Pool usage per server; utilization and waiting report the busiest server's pool"""
+    max_size = client.options.pool_options.max_pool_size
+    servers = {}
+    for gauge, field in ((metrics.mongodb_pool_connections, "open"),
+                         (metrics.mongodb_pool_checked_out, "checked_out"),
+                         (metrics.mongodb_pool_waiting, "waiting")):
+        for _, (server,), _, value in gauge.samples():
+            servers.setdefault(server, {"open": 0, "checked_out": 0, "waiting": 0})[field] = value
+    for pool in servers.values():
+        pool["utilization"] = round(pool["checked_out"] / max_size, 3) if max_size else 0.0
+    return {
+        "max_size_per_server": max_size,
+        "utilization": max((pool["utilization"] for pool in servers.values()), default=0.0),
+        "waiting": max((pool["waiting"] for pool in servers.values()), default=0),
+        "servers": servers,
+    }
+
+
+def readiness():
+    """(ready, report) from the cached ping, pool pressure and recent loop lag"""
+    database = db_health.stats()
+    pool = pool_stats()
+    loop_lag_ms = round(loop_monitor.recent_lag() * 1000, 2)
+
+    reasons = []
+    age = db_health.ping_age()
+    if not db_health.ok or age is None or age > HEALTH_MAX_PING_AGE_SECONDS:
+        reasons.append("database unreachable")
+    if pool["utilization"] >= READINESS_MAX_POOL_UTILIZATION or pool["waiting"] >= READINESS_MAX_POOL_WAITING:
+        reasons.append("connection pool saturated")
+    if loop_lag_ms >= READINESS_MAX_LOOP_LAG_MS:
+        reasons.append("event loop lagging")
+
+    return not reasons, {
+        "status": "ready" if not reasons else "not ready",
+        "reasons": reasons,
+        "database": database,
+        "pool": pool,
+        "event_loop_lag_ms": loop_lag_ms,
+    }
+
+
+db_health = DatabaseHealth()
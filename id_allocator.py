@@ -0,0 +1,85 @@
+import asyncio
+import os
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from database import get_database
+
+# How many IDs each worker reserves per round trip to the counters collection
+ID_BLOCK_SIZE = int(os.getenv("ID_BLOCK_SIZE", "50"))
+
+
+class BlockIdAllocator:
+    """Hi/lo ID allocator backed by the counters collection.
+
+    Each worker atomically reserves a block of IDs with a single ``$inc`` on the
+    counter document and then hands them out from memory, so most creates need
+    no database round trip and IDs stay unique across any number of workers.
+    """
+
+    def __init__(self, counter_model, collection_name: str, id_field: str, block_size: int = ID_BLOCK_SIZE):
+        self.counter_model = counter_model
+        self.collection_name = collection_name
+        self.id_field = id_field
+        self.block_size = block_size
+        self._next = 0
+        self._limit = 0
+        self._seeded = False
+        self._lock = asyncio.Lock()
+
+    async def next_id(self) -> int:
+        """Return the next ID from the reserved block, reserving a new block when exhausted"""
+        async with self._lock:
+            if self._next >= self._limit:
+                await self._reserve_block()
+            value = self._next
+            self._next += 1
+            return value
+
+    def reset(self):
+        """Drop the in-memory block so the next call reserves a fresh one"""
+        self._next = 0
+        self._limit = 0
+        self._seeded = False
+
+    async def _reserve_block(self):
+        counters = get_database()[self.counter_model.Settings.name]
+
+        if not self._seeded:
+            await self._seed(counters)
+            self._seeded = True
+
+        counter = await self._upsert(
+            counters,
+            {"$inc": {"sequence_value": self.block_size}}
+        )
+        high = counter["sequence_value"]
+        self._next = high - self.block_size + 1
+        self._limit = high + 1
+
+    async def _seed(self, counters):
+        """Make sure the counter never falls behind IDs that already exist"""
+        last = await get_database()[self.collection_name].find_one(
+            {},
+            projection={self.id_field: 1},
+            sort=[(self.id_field, -1)]
+        )
+        highest = last[self.id_field] if last else 0
+        await self._upsert(counters, {"$max": {"sequence_value": highest}})
+
+    async def _upsert(self, counters, update: dict):
+        try:
+            return await counters.find_one_and_update(
+                {"collection_name": self.collection_name},
+                update,
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Another worker created the counter concurrently; it exists now
+            return await counters.find_one_and_update(
+                {"collection_name": self.collection_name},
+                update,
+                return_document=ReturnDocument.AFTER
+            )
@@ -0,0 +1,144 @@
+import asyncio
+import os
+
+from pymongo.errors import BulkWriteError
+
+from models import Transactions
+
+# Entries arriving within this window are committed together in one insert_many
+JOURNAL_FLUSH_INTERVAL_MS = float(os.getenv("JOURNAL_FLUSH_INTERVAL_MS", "5"))
+JOURNAL_MAX_BATCH = int(os.getenv("JOURNAL_MAX_BATCH", "500"))
+# How often entries whose insert failed are tried again
+JOURNAL_RETRY_SECONDS = float(os.getenv("JOURNAL_RETRY_SECONDS", "5"))
+
+DUPLICATE_KEY = 11000
+
+
+class GroupCommitWriter:
+    """In-process group-commit writer for journal entries.
+
+    ``write()`` queues a document and waits until the batch it landed in has
+    been inserted. The first write in an idle window schedules a flush after
+    ``flush_interval_ms``; a full batch is flushed immediately.
+
+    Documents carry a unique key, so inserts are idempotent: a batch whose
+    insert failed is kept and retried by ``run()`` until it lands, and
+    entries that already made it in are skipped as duplicates.
+    """
+
+    def __init__(self, document_model, flush_interval_ms: float = JOURNAL_FLUSH_INTERVAL_MS,
+                 max_batch: int = JOURNAL_MAX_BATCH):
+        self.document_model = document_model
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_batch = max_batch
+        self._pending = []
+        self._timer = None
+        self._commits = set()
+        self._failed = []
+
+    async def write(self, document) -> bool:
+        """Queue a document and wait for its batch; False if it was left for a retry"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((document, future))
+
+        if len(self._pending) >= self.max_batch:
+            self._start_commit(self._take_batch())
+        elif self._timer is None:
+            self._timer = loop.create_task(self._flush_later())
+
+        return await future
+
+    async def flush(self):
+        """Commit everything queued so far and wait for in-flight batches"""
+        self._start_commit(self._take_batch())
+        if self._commits:
+            await asyncio.gather(*self._commits, return_exceptions=True)
+        await self.retry()
+
+    async def retry(self):
+        """Insert the documents of earlier failed commits again"""
+        documents, self._failed = self._failed, []
+        for start in range(0, len(documents), self.max_batch):
+            chunk = documents[start:start + self.max_batch]
+            try:
+                await self._insert(chunk)
+            except Exception as e:
+                self._failed.extend(chunk)
+                print(f"⚠️  Journal retry failed, {len(self._failed)} entries still waiting: {e}")
+
+    async def run(self):
+        """Background task retrying failed commits"""
+        while True:
+            await asyncio.sleep(JOURNAL_RETRY_SECONDS)
+            if self._failed:
+                await self.retry()
+
+    def stats(self) -> dict:
+        return {"pending": len(self._pending), "awaiting_retry": len(self._failed)}
+
+    async def _flush_later(self):
+        try:
+            await asyncio.sleep(self.flush_interval)
+        finally:
+            self._timer = None
+        self._start_commit(self._take_batch())
+
+    def _take_batch(self):
+        batch, self._pending = self._pending, []
+        return batch
+
+    def _start_commit(self, batch):
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._commit(batch))
+        self._commits.add(task)
+        task.add_done_callback(self._commits.discard)
+
+    async def _insert(self, documents):
+        """Unordered insert that treats entries already in the journal as written"""
+        try:
+            await self.document_model.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            if any(error["code"] != DUPLICATE_KEY for error in e.details.get("writeErrors", [])):
+                raise
+            if e.details.get("writeConcernErrors"):
+                raise
+
+    async def _commit(self, batch):
+        documents = [document for document, _ in batch]
+        try:
+            await self._insert(documents)
+        except Exception as e:
+            self._failed.extend(documents)
+            print(f"⚠️  Journal commit of {len(documents)} entries failed, will retry: {e}")
+            committed = False
+        else:
+            committed = True
+        for _, future in batch:
+            if not future.done():
+                future.set_result(committed)
+
+
+journal = GroupCommitWriter(Transactions)
+
+
+async def record(account, txn_type: str, amount: float):
+    """Journal a balance change using the account's post-image.
+
+    The balance has already changed, so a failed insert is retried in the
+    background rather than reported as a failed transaction.
+    """
+    await journal.write(Transactions(
+        acc_no=account.acc_no,
+        user_id=account.user_id,
+        txn_type=txn_type,
+        amount=amount,
+        balance_after=account.balance,
+        version=account.version
+    ))
+
+
+async def record_many(entries):
+    """Journal several entries; they share group commits with other writers"""
+    await asyncio.gather(*[journal.write(entry) for entry in entries])
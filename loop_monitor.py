@@ -0,0 +1,142 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+
+import metrics
+
+# How often the loop is asked to wake up; the delay past each deadline is the lag
+LOOP_LAG_SAMPLE_MS = float(os.getenv("LOOP_LAG_SAMPLE_MS", "50"))
+# A loop blocked at least this long gets its stack and route reported
+LOOP_LAG_THRESHOLD_MS = float(os.getenv("LOOP_LAG_THRESHOLD_MS", "100"))
+LOOP_LAG_REPORTS_KEPT = int(os.getenv("LOOP_LAG_REPORTS_KEPT", "20"))
+# Samples behind recent_lag(), about one second at the default sample interval
+LOOP_LAG_WINDOW = int(os.getenv("LOOP_LAG_WINDOW", "20"))
+STACK_DEPTH = 15
+
+event_loop_lag = metrics.Histogram(
+    "event_loop_lag_seconds", "Delay between when a loop wake-up was due and when it ran", threadsafe=False
+)
+event_loop_stalls = metrics.Counter(
+    "event_loop_stalls", "Times the event loop was blocked for longer than the report threshold"
+)
+
+
+def _describe(scope, task) -> str:
+    """Route for a request scope, or the coroutine behind a task outside any request"""
+    if scope is not None:
+        route = scope.get("route")
+        return f'{scope["method"]} {getattr(route, "path", None) or scope["path"]}'
+    if task is not None:
+        return f"task {task.get_coro().__qualname__}"
+    return "loop callback outside any task"
+
+
+class LoopMonitor:
+    """Samples event-loop scheduling lag and reports what was running when it stalls.
+
+    A coroutine sleeps for ``sample_ms`` at a time and records how late each
+    wake-up was. A watchdog thread notices when the wake-ups stop arriving;
+    while the loop is still blocked it captures the loop thread's stack and
+    the route of the request whose task is running, so the report points at
+    the blocking call itself.
+    """
+
+    def __init__(self, sample_ms: float = LOOP_LAG_SAMPLE_MS, threshold_ms: float = LOOP_LAG_THRESHOLD_MS):
+        self.sample_interval = sample_ms / 1000
+        self.threshold = threshold_ms / 1000
+        self.active_requests = {}
+        self.reports = deque(maxlen=LOOP_LAG_REPORTS_KEPT)
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.recent_lags = deque(maxlen=LOOP_LAG_WINDOW)
+        self._last_beat = None
+        self._loop = None
+        self._loop_thread_id = None
+        self._stopped = threading.Event()
+
+    async def run(self):
+        """Background task sampling lag; also starts and stops the watchdog thread"""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stopped.clear()
+        threading.Thread(target=self._watch, name="loop-watchdog", daemon=True).start()
+        try:
+            while True:
+                self._last_beat = time.monotonic()
+                await asyncio.sleep(self.sample_interval)
+                lag = max(0.0, time.monotonic() - self._last_beat - self.sample_interval)
+                self.last_lag = lag
+                self.max_lag = max(self.max_lag, lag)
+                self.recent_lags.append(lag)
+                event_loop_lag.observe(lag)
+        finally:
+            self._stopped.set()
+
+    def _watch(self):
+        reported_beat = None
+        while not self._stopped.wait(self.threshold / 2):
+            beat = self._last_beat
+            if beat is None or beat == reported_beat:
+                continue
+            blocked = time.monotonic() - beat - self.sample_interval
+            if blocked >= self.threshold:
+                reported_beat = beat
+                self._report(blocked)
+
+    def _report(self, blocked: float):
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = traceback.format_stack(frame)[-STACK_DEPTH:] if frame is not None else []
+        task = asyncio.current_task(self._loop)
+        where = _describe(self.active_requests.get(task), task)
+
+        event_loop_stalls.inc()
+        self.reports.append({
+            "at": datetime.utcnow(),
+            "blocked_ms": round(blocked * 1000, 1),
+            "where": where,
+            "stack": [line.rstrip() for line in stack],
+        })
+        print(f"🐌 Event loop blocked for at least {blocked * 1000:.0f} ms in {where}:\n{''.join(stack)}")
+
+    def recent_lag(self) -> float:
+        """Worst lag over the last LOOP_LAG_WINDOW samples, in seconds"""
+        return max(self.recent_lags, default=0.0)
+
+    def stats(self) -> dict:
+        return {
+            "sample_interval_ms": self.sample_interval * 1000,
+            "threshold_ms": self.threshold * 1000,
+            "last_lag_ms": round(self.last_lag * 1000, 3),
+            "recent_lag_ms": round(self.recent_lag() * 1000, 3),
+            "max_lag_ms": round(self.max_lag * 1000, 3),
+            "active_requests": len(self.active_requests),
+            "recent_stalls": list(self.reports),
+        }
+
+
+class LoopMonitorMiddleware:
+    """ASGI middleware remembering which request each task is serving, for stall reports"""
+
+    def __init__(self, app, monitor: LoopMonitor = None):
+        self.app = app
+        self.monitor = monitor or loop_monitor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        task = asyncio.current_task()
+        self.monitor.active_requests[task] = scope
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.monitor.active_requests.pop(task, None)
+
+
+loop_monitor = LoopMonitor()
@@ -1,23 +1,39 @@
-from fastapi import FastAPI, Depends, HTTPException
+import asyncio
+from fastapi import FastAPI, Depends, HTTPException, Request
+from fastapi.responses import ORJSONResponse, Response
 from fastapi.security import OAuth2PasswordRequestForm
-from datetime import timedelta
+from datetime import datetime
+from typing import Optional
 from fastapi.middleware.cors import CORSMiddleware
 import os
 
-from database import init_db
+from database import init_db, get_collection, client_settings
 from routers import accounts as accounts_router
 from routers import users as users_router
-from auth import create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
-from schemas import Token
+from routers import admin as admin_router
+from auth import issue_token_pair, decode_refresh_token, get_current_token_claims, metrics_reader
+from schemas import Token, RefreshRequest
 from models import Users
-from security import verify_password
+from security import verify_password_async, shutdown_hash_executor
+from journal import journal
+from pagination import NEXT_CURSOR_HEADER
+from admission import login_admission
+from revocation import revocations
+from compression import CompressionMiddleware
+import metrics
+from querylog import DbTimingMiddleware
+from loop_monitor import loop_monitor, LoopMonitorMiddleware
+from profiling import ProfilingMiddleware, PROFILE_ID_HEADER
+from tracing import tracer, TracingMiddleware
+from health import db_health, readiness
 
 app = FastAPI(
     title="Bank Management System API",
     description="A comprehensive banking system with MongoDB backend",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # CORS configuration - secure for production
@@ -36,17 +52,57 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "Server-Timing", PROFILE_ID_HEADER],
 )
 
+# Compress large JSON bodies (admin lists are big and repetitive); small ones pass through
+app.add_middleware(CompressionMiddleware)
+
+# Count DB commands and time per request; reported in the Server-Timing header
+app.add_middleware(DbTimingMiddleware)
+
+# Lets event-loop stall reports name the route that was running
+app.add_middleware(LoopMonitorMiddleware)
+
+# Admin requests sent with an X-Profile header run under a sampling profiler and tracemalloc
+app.add_middleware(ProfilingMiddleware)
+
+# Root span for sampled requests, continuing the caller's traceparent
+app.add_middleware(TracingMiddleware)
+
+# Outermost, so recorded latency covers every other middleware
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Long-running tasks started with the app and cancelled on shutdown
+background_tasks = []
+
+
 # Initialize database on startup
 @app.on_event("startup")
 async def startup():
     await init_db()
     print("✅ Database initialized successfully")
+    print(f"🔌 MongoDB client settings: {client_settings()}")
+    background_tasks.append(asyncio.create_task(revocations.run()))
+    background_tasks.append(asyncio.create_task(loop_monitor.run()))
+    background_tasks.append(asyncio.create_task(tracer.run()))
+    background_tasks.append(asyncio.create_task(db_health.run()))
+    background_tasks.append(asyncio.create_task(journal.run()))
+
+
+# Commit pending journal entries and release the hashing pool
+@app.on_event("shutdown")
+async def shutdown():
+    for task in background_tasks:
+        task.cancel()
+    await journal.flush()
+    await tracer.flush()
+    shutdown_hash_executor()
 
 # Include routers
 app.include_router(accounts_router.router)
 app.include_router(users_router.router)
+app.include_router(admin_router.router)
 
 @app.get("/")
 async def read_root():
@@ -59,26 +115,85 @@ async def read_root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "database": "connected"}
+    """Readiness in the original shape; the database state comes from the cached background ping"""
+    ready, report = readiness()
+    return ORJSONResponse(
+        {
+            "status": "healthy" if ready else "unhealthy",
+            "database": "connected" if report["database"]["connected"] else "disconnected",
+            "reasons": report["reasons"],
+        },
+        status_code=200 if ready else 503
+    )
+
+@app.get("/health/live")
+async def liveness():
+    """The process is up and its event loop answers; never touches the database"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness_probe():
+    """503 while MongoDB is unreachable, the pool is saturated or the event loop lags"""
+    ready, report = readiness()
+    return ORJSONResponse(report, status_code=200 if ready else 503)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint(reader=Depends(metrics_reader)):
+    """Request, MongoDB command and connection-pool metrics in the Prometheus text format"""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
 
 @app.post("/login", response_model=Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends()):
+async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
+    # Shed abusive bursts before spending a lookup or a hash on them
+    # Behind a proxy this is the trusted X-Forwarded-For address (uvicorn --proxy-headers
+    # with FORWARDED_ALLOW_IPS), so callers cannot pick their own rate-limit bucket
+    client_ip = request.client.host if request.client else "unknown"
+    login_admission.check_rate(form_data.username, client_ip)
+
     # Find user by username
     user = await Users.find_one(Users.username == form_data.username)
 
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    access_token = create_access_token(
-        data={
-            "sub": user.username,
-            "user_id": user.user_id,
-            "role": user.role
-        },
-        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    async with login_admission.slot():
+        verified = await verify_password_async(form_data.password, user.hashed_password)
+    if not verified:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    return issue_token_pair(user.username, user.user_id, user.role)
+
+
+@app.post("/refresh", response_model=Token)
+async def refresh(request: RefreshRequest):
+    """Exchange a refresh token for a new token pair without re-entering the password"""
+    claims = decode_refresh_token(request.refresh_token)
+
+    # Refresh tokens are single use: rotation revokes this one, and a replay is rejected
+    if not await revocations.revoke(claims["jti"], datetime.utcfromtimestamp(claims["exp"])):
+        raise HTTPException(status_code=401, detail="Refresh token has already been used")
+
+    # Pick up role changes and refuse deleted users
+    user = await get_collection(Users).find_one(
+        {"user_id": claims["user_id"]},
+        {"username": 1, "user_id": 1, "role": 1}
     )
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
 
-    return {
-        "access_token": access_token,
-        "token_type": "bearer"
-    }
\ No newline at end of file
+    return issue_token_pair(user["username"], user["user_id"], user["role"])
+
+
+@app.post("/logout", status_code=200)
+async def logout(request: Optional[RefreshRequest] = None, claims=Depends(get_current_token_claims)):
+    """Revoke the current access token and, if given, the refresh token"""
+    if claims.get("jti"):
+        await revocations.revoke(claims["jti"], datetime.utcfromtimestamp(claims["exp"]))
+
+    if request:
+        refresh_claims = decode_refresh_token(request.refresh_token)
+        if refresh_claims["user_id"] != claims.get("user_id"):
+            raise HTTPException(status_code=403, detail="Refresh token belongs to another user")
+        await revocations.revoke(refresh_claims["jti"], datetime.utcfromtimestamp(refresh_claims["exp"]))
+
+    return {"message": "Logged out successfully"}
\ No newline at end of file
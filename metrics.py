@@ -0,0 +1,287 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+
+from pymongo import monitoring
+
+# Latency buckets in seconds, shared by HTTP, command and pool-wait histograms
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+registry = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames, labels, extra=()) -> str:
+    pairs = list(zip(labelnames, labels)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Metric:
+    """Base for metrics rendered in the Prometheus text exposition format.
+
+    Values are keyed by the tuple of label values. Metrics fed by pymongo
+    listeners, which run on the driver's worker threads, take a lock on
+    every write; ones only written from the event loop skip it.
+    """
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames=(), threadsafe: bool = True):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock() if threadsafe else nullcontext()
+        registry.append(self)
+
+    def samples(self):
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for name, labels, extra, value in self.samples():
+            lines.append(f"{name}{_format_labels(self.labelnames, labels, extra)} {value}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in list(self._values.items()):
+            yield self.name + "_total", labels, (), value
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), threadsafe: bool = True):
+        super().__init__(name, documentation, labelnames, threadsafe)
+        self._function = None
+
+    def set_function(self, function):
+        """Read the (unlabelled) value from ``function()`` at scrape time instead of tracking it"""
+        self._function = function
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels):
+        self._values[labels] = value
+
+    def value(self, *labels) -> float:
+        if self._function is not None:
+            return self._function()
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        if self._function is not None:
+            yield self.name, (), (), self._function()
+            return
+        for labels, value in list(self._values.items()):
+            yield self.name, labels, (), value
+
+
+class Histogram(Metric):
+    """Fixed-bucket histogram; observing is a bisect plus three additions"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS,
+                 threadsafe: bool = True):
+        super().__init__(name, documentation, labelnames, threadsafe)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels):
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                # Per-bucket counts (last slot is +Inf), then sum and count
+                series = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self, *labels):
+        """(cumulative bucket counts, sum, count) for one label set"""
+        series = self._values.get(labels)
+        if series is None:
+            return [0] * (len(self.buckets) + 1), 0.0, 0
+        counts, total, count = series
+        cumulative, running = [], 0
+        for bucket_count in counts:
+            running += bucket_count
+            cumulative.append(running)
+        return cumulative, total, count
+
+    def samples(self):
+        for labels in list(self._values):
+            cumulative, total, count = self.snapshot(*labels)
+            for bound, value in zip(self.buckets + ("+Inf",), cumulative):
+                yield self.name + "_bucket", labels, (("le", bound),), value
+            yield self.name + "_sum", labels, (), total
+            yield self.name + "_count", labels, (), count
+
+
+def render() -> str:
+    return "\n".join(metric.render() for metric in registry) + "\n"
+
+
+# Written only from the event loop
+http_requests = Counter(
+    "http_requests", "HTTP requests handled", ("method", "route", "status"), threadsafe=False
+)
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route"), threadsafe=False
+)
+http_requests_in_flight = Gauge("http_requests_in_flight", "HTTP requests currently being handled")
+
+mongodb_command_duration = Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency", ("command", "collection")
+)
+mongodb_command_failures = Counter(
+    "mongodb_command_failures", "MongoDB commands that failed", ("command", "collection")
+)
+mongodb_pool_checkout_wait = Histogram(
+    "mongodb_pool_checkout_wait_seconds", "Time spent waiting to check a connection out of the pool"
+)
+mongodb_pool_checkout_failures = Counter(
+    "mongodb_pool_checkout_failures", "Connection checkouts that failed", ("reason",)
+)
+# Each server has its own pool, capped at maxPoolSize; these are labelled by server address
+mongodb_pool_connections = Gauge("mongodb_pool_connections", "Open connections in the pool", ("server",))
+mongodb_pool_checked_out = Gauge("mongodb_pool_checked_out", "Connections currently checked out", ("server",))
+mongodb_pool_waiting = Gauge(
+    "mongodb_pool_waiting", "Operations waiting to check a connection out", ("server",)
+)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route request counts, latency and in-flight requests.
+
+    Routes are labelled by their path template (``/accounts/{id}``), so label
+    cardinality stays bounded; unmatched paths share one label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        # A plain int is cheaper than a gauge update; the gauge reads it at scrape time
+        self.in_flight = 0
+        http_requests_in_flight.set_function(lambda: self.in_flight)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.in_flight -= 1
+            route = scope.get("route")
+            route = getattr(route, "path", None) or "<unmatched>"
+            http_request_duration.observe(elapsed, scope["method"], route)
+            http_requests.inc(scope["method"], route, status_code)
+
+
+def command_collection(command_name: str, command: dict) -> str:
+    """Collection a command targets, or "" for database-level commands"""
+    if command_name == "getMore":
+        return command.get("collection", "")
+    target = command.get(command_name)
+    return target if isinstance(target, str) else ""
+
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """Feeds MongoDB command latencies into the command histogram"""
+
+    def __init__(self):
+        self._pending = {}
+
+    def started(self, event):
+        self._pending[(event.connection_id, event.request_id)] = command_collection(event.command_name, event.command)
+
+    def succeeded(self, event):
+        collection = self._pending.pop((event.connection_id, event.request_id), "")
+        mongodb_command_duration.observe(event.duration_micros / 1e6, event.command_name, collection)
+
+    def failed(self, event):
+        collection = self._pending.pop((event.connection_id, event.request_id), "")
+        mongodb_command_duration.observe(event.duration_micros / 1e6, event.command_name, collection)
+        mongodb_command_failures.inc(event.command_name, collection)
+
+
+def server_label(address) -> str:
+    host, port = address
+    return f"{host}:{port}"
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """Tracks pool size, checked-out connections, waiters and checkout wait times"""
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        mongodb_pool_connections.inc(server_label(event.address))
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        mongodb_pool_connections.dec(server_label(event.address))
+
+    def connection_check_out_started(self, event):
+        mongodb_pool_waiting.inc(server_label(event.address))
+
+    def connection_check_out_failed(self, event):
+        mongodb_pool_waiting.dec(server_label(event.address))
+        mongodb_pool_checkout_failures.inc(event.reason)
+        if event.duration is not None:
+            mongodb_pool_checkout_wait.observe(event.duration)
+
+    def connection_checked_out(self, event):
+        server = server_label(event.address)
+        mongodb_pool_waiting.dec(server)
+        mongodb_pool_checked_out.inc(server)
+        if event.duration is not None:
+            mongodb_pool_checkout_wait.observe(event.duration)
+
+    def connection_checked_in(self, event):
+        mongodb_pool_checked_out.dec(server_label(event.address))
@@ -1,9 +1,11 @@
 from beanie import Document
 from pydantic import Field, EmailStr
-from typing import Optional
+from typing import Literal, Optional
 from datetime import datetime
 from pymongo import IndexModel
 
+from id_allocator import BlockIdAllocator
+
 
 class Counter(Document):
     """Counter collection for auto-increment IDs"""
@@ -12,6 +14,9 @@ class Counter(Document):
     
     class Settings:
         name = "counters"
+        indexes = [
+            IndexModel("collection_name", unique=True),
+        ]
 
 
 class Users(Document):
@@ -22,6 +27,7 @@ class Users(Document):
     mob_no: int = Field(..., unique=True)
     role: str = Field(default="user")
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    version: int = Field(default=0)  # Bumped on every write; feeds the ETag
     
     class Settings:
         name = "users"
@@ -34,22 +40,8 @@ class Users(Document):
     
     @classmethod
     async def get_next_id(cls) -> int:
-        """Get next auto-increment ID - simplified and reliable"""
-        try:
-            # Simple approach: find the highest existing ID and add 1
-            last_user = await cls.find().sort([("user_id", -1)]).limit(1).to_list()
-            
-            if last_user:
-                return last_user[0].user_id + 1
-            else:
-                return 1
-                
-        except Exception as e:
-            # If all else fails, use timestamp-based ID
-            import time
-            fallback_id = int(str(int(time.time()))[-6:])  # Last 6 digits of timestamp
-            print(f"Using timestamp fallback ID: {fallback_id}")
-            return fallback_id
+        """Get next auto-increment ID from this worker's reserved block"""
+        return await user_ids.next_id()
 
 
 class Accounts(Document):
@@ -66,6 +58,7 @@ class Accounts(Document):
     
     # Reference to user using user_id instead of ObjectId
     user_id: int
+    version: int = Field(default=0)  # Bumped on every write; feeds the ETag
     
     class Settings:
         name = "accounts"
@@ -76,19 +69,47 @@ class Accounts(Document):
     
     @classmethod
     async def get_next_id(cls) -> int:
-        """Get next auto-increment ID - simplified and reliable"""
-        try:
-            # Simple approach: find the highest existing ID and add 1
-            last_account = await cls.find().sort([("acc_no", -1)]).limit(1).to_list()
-            
-            if last_account:
-                return last_account[0].acc_no + 1
-            else:
-                return 1
-                
-        except Exception as e:
-            # If all else fails, use timestamp-based ID
-            import time
-            fallback_id = int(str(int(time.time()))[-6:])  # Last 6 digits of timestamp
-            print(f"Using timestamp fallback ID: {fallback_id}")
-            return fallback_id
\ No newline at end of file
+        """Get next auto-increment ID from this worker's reserved block"""
+        return await account_ids.next_id()
+
+
+class Transactions(Document):
+    """Immutable journal entry for a balance change"""
+    acc_no: int
+    user_id: int
+    txn_type: Literal["deposit", "withdraw", "transfer_out", "transfer_in"]
+    amount: float
+    balance_after: float
+    version: Optional[int] = None  # Account version the change produced; with acc_no, its idempotency key
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "transactions"
+        indexes = [
+            IndexModel([("acc_no", 1), ("created_at", -1)]),
+            IndexModel("user_id"),
+            # Re-inserting an entry after a failed or uncertain commit is rejected instead of duplicated
+            IndexModel(
+                [("acc_no", 1), ("version", 1)], unique=True,
+                partialFilterExpression={"version": {"$type": "number"}}
+            ),
+        ]
+
+
+class RevokedTokens(Document):
+    """Revoked token IDs; the TTL index drops them once the token has expired anyway"""
+    jti: str
+    expires_at: datetime
+    revoked_at: datetime = Field(default_factory=datetime.utcnow)  # set by the server on revoke
+
+    class Settings:
+        name = "revoked_tokens"
+        indexes = [
+            IndexModel("jti", unique=True),
+            IndexModel("expires_at", expireAfterSeconds=0),
+            IndexModel("revoked_at"),
+        ]
+
+
+user_ids = BlockIdAllocator(Counter, "users", "user_id")
+account_ids = BlockIdAllocator(Counter, "accounts", "acc_no")
@@ -0,0 +1,55 @@
+import base64
+import json
+import os
+
+from fastapi import HTTPException
+
+# Upper bound for the ``limit`` query parameter on list endpoints
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "1000"))
+
+# Response header carrying the cursor of the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(key: int) -> str:
+    """Encode the last key of a page as an opaque cursor"""
+    raw = json.dumps({"k": key}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Decode a cursor produced by encode_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded))["k"]
+        if not isinstance(key, int):
+            raise ValueError
+        return key
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def keyset_cursor(collection, key: str, after, projection):
+    """Motor cursor over documents after the cursor position, ordered by key"""
+    query = {} if after is None else {key: {"$gt": decode_cursor(after)}}
+    return collection.find(query, projection).sort(key, 1)
+
+
+async def keyset_page(collection, key: str, limit, after, projection):
+    """Fetch one page of raw documents ordered by a unique indexed key.
+
+    Returns ``(documents, next_cursor)``. Without a limit the whole collection
+    is returned. One extra document is read to know whether a next page exists,
+    and each page is a range scan on the key's index, so deep pages cost the
+    same as the first one.
+    """
+    documents = keyset_cursor(collection, key, after, projection)
+    if limit is None:
+        return await documents.to_list(None), None
+
+    page = await documents.limit(limit + 1).to_list(None)
+    if len(page) <= limit:
+        return page, None
+
+    page = page[:limit]
+    return page, encode_cursor(page[-1][key])
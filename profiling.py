@@ -0,0 +1,192 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, OrderedDict
+from datetime import datetime
+from uuid import uuid4
+
+from starlette.datastructures import MutableHeaders
+
+from auth import is_admin_request
+
+# Requests carrying this header from an admin are profiled
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "1"))
+PROFILES_KEPT = int(os.getenv("PROFILES_KEPT", "20"))
+STACK_DEPTH = 40
+TRACEMALLOC_FRAMES = 5
+TRACEMALLOC_TOP = 15
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def _collapse(frames) -> str:
+    """Outermost-first frames joined the way flamegraph tools expect"""
+    return ";".join(_frame_label(frame) for frame in frames[-STACK_DEPTH:])
+
+
+def _thread_frames(frame):
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+
+class TaskSampler:
+    """Sampling profiler for a single asyncio task.
+
+    A helper thread wakes every ``interval`` seconds. When the task is
+    running it records the loop thread's stack; when the task is suspended
+    it records the coroutine chain it is awaiting in. Other requests sharing
+    the loop are never sampled.
+    """
+
+    def __init__(self, task, loop, loop_thread_id: int, interval: float):
+        self.task = task
+        self.loop = loop
+        self.loop_thread_id = loop_thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self.running = 0
+        self.awaiting = 0
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            if asyncio.current_task(self.loop) is self.task:
+                frame = sys._current_frames().get(self.loop_thread_id)
+                stack = _collapse(_thread_frames(frame))
+                self.running += 1
+            else:
+                stack = "(awaiting);" + _collapse(self.task.get_stack(limit=STACK_DEPTH))
+                self.awaiting += 1
+            self.samples[stack] += 1
+
+
+def _allocation_summary(before, after) -> list:
+    ignore = (tracemalloc.Filter(False, tracemalloc.__file__),)
+    stats = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), "lineno")
+    return [str(stat) for stat in stats[:TRACEMALLOC_TOP]]
+
+
+def _render(profile: dict, samples: Counter, allocations: list) -> str:
+    lines = [
+        f"Profile {profile['id']}: {profile['request']} -> {profile['status']} "
+        f"in {profile['duration_ms']} ms",
+        f"Samples: {profile['samples']} every {PROFILE_SAMPLE_INTERVAL_MS} ms "
+        f"({profile['running_samples']} running, {profile['awaiting_samples']} awaiting)",
+        f"Peak traced memory: {profile['peak_memory_kb']} KiB",
+        "",
+        "# Collapsed stacks (flamegraph.pl / speedscope), most frequent first",
+    ]
+    lines += [f"{stack} {count}" for stack, count in samples.most_common()]
+    lines += [
+        "",
+        "# Allocations still held at the end of the request (tracemalloc, whole process)",
+    ]
+    lines += allocations
+    return "\n".join(lines) + "\n"
+
+
+class ProfilingMiddleware:
+    """Profiles admin requests that carry an ``X-Profile`` header.
+
+    Requests without the header pay for one scan of the raw header list and
+    nothing else. Profiled requests run under a ``TaskSampler`` with
+    tracemalloc on; the report is kept in memory for download from
+    ``/admin/profiles/{id}`` and its id is returned in ``X-Profile-Id``.
+    Only one request is profiled at a time, because tracemalloc is process-wide.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.profiles = profiles
+        self._active = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self._active or not any(
+            name == PROFILE_HEADER for name, _ in scope["headers"]
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        if not await is_admin_request(scope):
+            await self.app(scope, receive, send)
+            return
+
+        self._active = True
+        try:
+            await self._profile(scope, receive, send)
+        finally:
+            self._active = False
+
+    async def _profile(self, scope, receive, send):
+        profile_id = uuid4().hex[:12]
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message)[PROFILE_ID_HEADER] = profile_id
+            await send(message)
+
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+
+        sampler = TaskSampler(
+            asyncio.current_task(), asyncio.get_running_loop(), threading.get_ident(),
+            PROFILE_SAMPLE_INTERVAL_MS / 1000
+        )
+        sampler.start()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            sampler.stop()
+            after = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+
+            route = scope.get("route")
+            profile = {
+                "id": profile_id,
+                "at": datetime.utcnow(),
+                "request": f'{scope["method"]} {getattr(route, "path", None) or scope["path"]}',
+                "status": status_code,
+                "duration_ms": round(elapsed * 1000, 2),
+                "samples": sampler.running + sampler.awaiting,
+                "running_samples": sampler.running,
+                "awaiting_samples": sampler.awaiting,
+                "peak_memory_kb": round(peak / 1024, 1),
+            }
+            report = _render(profile, sampler.samples, _allocation_summary(before, after))
+            self.profiles[profile_id] = (profile, report)
+            while len(self.profiles) > PROFILES_KEPT:
+                self.profiles.popitem(last=False)
+
+
+# Finished profiles by id, oldest first: (summary, text report)
+profiles = OrderedDict()
@@ -0,0 +1,18 @@
+from schemas import ShowAccount, ShowTransaction, ShowUser, ShowUserProfile
+
+
+def projection(schema, exclude=()):
+    """Mongo projection keeping only the fields a response schema exposes"""
+    fields = {field: 1 for field in schema.model_fields if field not in exclude}
+    fields["_id"] = 0
+    return fields
+
+
+ACCOUNT_PROJECTION = projection(ShowAccount)
+USER_PROJECTION = projection(ShowUser, exclude=("accounts",))
+# Cached and single-document reads also carry the write version their ETag is built from
+VERSIONED_ACCOUNT_PROJECTION = {**ACCOUNT_PROJECTION, "version": 1}
+TRANSACTION_PROJECTION = projection(ShowTransaction)
+PROFILE_PROJECTION = projection(
+    ShowUserProfile, exclude=("accounts", "total_balance", "total_accounts")
+)
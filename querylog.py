@@ -0,0 +1,150 @@
+import json
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from pymongo import monitoring
+from starlette.datastructures import MutableHeaders
+
+from metrics import command_collection
+
+# Commands at least this slow are printed with the shape of their filter
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+# Server-Timing header with each request's DB command count and time: "false" (default),
+# "admin" for requests with an admin bearer token, or "true" for every response
+DB_SERVER_TIMING = os.getenv("DB_SERVER_TIMING", "false").lower()
+if DB_SERVER_TIMING in ("1", "yes"):
+    DB_SERVER_TIMING = "true"
+
+# Where each command keeps the part worth showing in the slow-query log
+FILTER_FIELDS = {
+    "find": "filter",
+    "count": "query",
+    "distinct": "query",
+    "findAndModify": "query",
+    "aggregate": "pipeline",
+    "update": "updates",
+    "delete": "deletes",
+}
+
+
+class DbStats:
+    """Database commands issued on behalf of one request (or one tracked block)"""
+
+    def __init__(self, label: str = ""):
+        self.label = label
+        # (command, collection, milliseconds); appended from driver threads, and list.append is atomic
+        self.commands = []
+
+    @property
+    def count(self) -> int:
+        return len(self.commands)
+
+    @property
+    def total_ms(self) -> float:
+        return sum(duration for _, _, duration in self.commands)
+
+
+current_stats: ContextVar = ContextVar("db_stats", default=None)
+
+
+@contextmanager
+def track_db(label: str = ""):
+    """Collect the database commands issued inside the block, e.g. to assert a round-trip budget"""
+    stats = DbStats(label)
+    token = current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        current_stats.reset(token)
+
+
+def _shape(value):
+    """Replace literal values with "?" so queries that differ only in values look the same"""
+    if isinstance(value, dict):
+        return {key: _shape(item) for key, item in value.items()}
+    if isinstance(value, list):
+        if value and all(isinstance(item, dict) for item in value):
+            return [_shape(item) for item in value]
+        return ["?"]
+    return "?"
+
+
+def filter_shape(command_name: str, command: dict):
+    field = FILTER_FIELDS.get(command_name)
+    if field is None or field not in command:
+        return None
+    if command_name in ("update", "delete"):
+        # Bulk writes repeat the same shape thousands of times; show each distinct one once
+        shapes = {}
+        for statement in command[field]:
+            shape = _shape(statement.get("q", {}))
+            shapes.setdefault(json.dumps(shape, sort_keys=True), shape)
+        return list(shapes.values())
+    return _shape(command[field])
+
+
+class QueryLogListener(monitoring.CommandListener):
+    """Attributes each command to the current request and prints the slow ones"""
+
+    def __init__(self, slow_ms: float = SLOW_QUERY_MS):
+        self.slow_ms = slow_ms
+        self._pending = {}
+
+    def started(self, event):
+        # Keep a reference only; the shape is worked out for slow commands alone
+        self._pending[(event.connection_id, event.request_id)] = event.command
+
+    def succeeded(self, event):
+        self._finished(event, failed=False)
+
+    def failed(self, event):
+        self._finished(event, failed=True)
+
+    def _finished(self, event, failed: bool):
+        command = self._pending.pop((event.connection_id, event.request_id), None) or {}
+        collection = command_collection(event.command_name, command)
+        duration_ms = event.duration_micros / 1000
+        stats = current_stats.get()
+        if stats is not None:
+            stats.commands.append((event.command_name, collection, duration_ms))
+
+        if duration_ms >= self.slow_ms:
+            shape = json.dumps(filter_shape(event.command_name, command), default=str)
+            outcome = "failed" if failed else "ok"
+            where = f" during {stats.label}" if stats is not None and stats.label else ""
+            print(f"🐢 Slow query {duration_ms:.1f} ms ({outcome}): "
+                  f"{event.command_name} {collection} {shape}{where}")
+
+
+class DbTimingMiddleware:
+    """ASGI middleware tracking DB commands per request and reporting them in Server-Timing.
+
+    The header reveals how much database work a request caused, so it is off
+    unless ``server_timing`` is "true", or "admin" to show it to admins only.
+    """
+
+    def __init__(self, app, server_timing: str = DB_SERVER_TIMING):
+        # auth imports database, which imports this module for its listener
+        from auth import is_admin_request
+        self.app = app
+        self.server_timing = server_timing
+        self.is_admin = is_admin_request
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        report = self.server_timing == "true" or (self.server_timing == "admin" and await self.is_admin(scope))
+        with track_db(f'{scope["method"]} {scope["path"]}') as stats:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start" and report:
+                    headers = MutableHeaders(scope=message)
+                    headers.append(
+                        "Server-Timing",
+                        f'db;dur={stats.total_ms:.2f};desc="{stats.count} commands"'
+                    )
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
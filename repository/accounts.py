@@ -1,15 +1,49 @@
+import os
+from collections import defaultdict
+from uuid import uuid4
+
 from fastapi import HTTPException, status
-from models import Accounts, Users
+from models import Accounts, Users, Transactions
 from schemas import CreateAccount, UpdateAccountbyUser as UpdateAccount, UpdateAccountbyAdmin
-from pymongo.errors import DuplicateKeyError
+from pymongo import UpdateOne, ReturnDocument
+from pymongo.read_concern import ReadConcern
+from pymongo.write_concern import WriteConcern
+from pymongo.errors import DuplicateKeyError, BulkWriteError, PyMongoError
+from beanie import UpdateResponse
+from beanie.odm.operators.update.general import Inc, Set
+
+import journal
+from database import client, get_collection
+from pagination import keyset_page, keyset_cursor
+from streaming import STREAM_BATCH_SIZE
+from cache import account_cache, profile_cache
+from tracing import traced
+from projections import ACCOUNT_PROJECTION, VERSIONED_ACCOUNT_PROJECTION, TRANSACTION_PROJECTION
+
+# Largest number of operations accepted by a single batch request
+MAX_BATCH_OPERATIONS = int(os.getenv("MAX_BATCH_OPERATIONS", "5000"))
+
+
+async def _invalidate(acc_no: int, user_id: int):
+    """Drop cached reads that include this account"""
+    await account_cache.invalidate(acc_no)
+    await profile_cache.invalidate(user_id)
 
 
-async def get_all():
-    """Get all accounts"""
-    accounts = await Accounts.find_all().to_list()
-    return [account.dict() for account in accounts]
+@traced
+async def get_all(limit=None, after=None):
+    """Get accounts ordered by acc_no, one keyset page at a time"""
+    return await keyset_page(get_collection(Accounts), "acc_no", limit, after, ACCOUNT_PROJECTION)
 
 
+def stream_all(after=None):
+    """Iterate accounts after the cursor straight off the motor cursor"""
+    return keyset_cursor(
+        get_collection(Accounts), "acc_no", after, ACCOUNT_PROJECTION
+    ).batch_size(STREAM_BATCH_SIZE)
+
+
+@traced
 async def create(request: CreateAccount, current_user):
     """Create a new account"""
     if request.balance < 100.0:
@@ -41,11 +75,13 @@ async def create(request: CreateAccount, current_user):
     
     try:
         await new_account.insert()
-        return new_account.dict()
+        await profile_cache.invalidate(new_account.user_id)
+        return new_account.model_dump()
     except DuplicateKeyError:
         raise HTTPException(status_code=400, detail="Account creation failed")
 
 
+@traced
 async def destroy(id: int):
     """Delete an account"""
     account = await Accounts.find_one(Accounts.acc_no == id)
@@ -53,78 +89,331 @@ async def destroy(id: int):
         raise HTTPException(status_code=404, detail=f"Account with id {id} not found")
     
     await account.delete()
+    await _invalidate(account.acc_no, account.user_id)
     return {"message": "Account deleted successfully"}
 
 
-async def update(id: int, request: UpdateAccount):
-    """Update account (user level)"""
-    account = await Accounts.find_one(Accounts.acc_no == id)
+async def _apply_update(id: int, request):
+    """Set the changed fields and bump the version in one atomic update"""
+    update_data = request.model_dump(exclude_unset=True)
+    update_data.pop("acc_no", None)  # Don't update the ID
+    if not update_data:
+        account = await Accounts.find_one(Accounts.acc_no == id)
+    else:
+        account = await Accounts.find_one(Accounts.acc_no == id).update(
+            Set(update_data),
+            Inc({Accounts.version: 1}),
+            response_type=UpdateResponse.NEW_DOCUMENT
+        )
     if not account:
         raise HTTPException(status_code=404, detail=f"Account with id {id} not found")
 
-    update_data = request.dict(exclude_unset=True)
     if update_data:
-        for field, value in update_data.items():
-            if field != "acc_no":  # Don't update the ID
-                setattr(account, field, value)
-        await account.save()
+        await _invalidate(account.acc_no, account.user_id)
+    return account.model_dump()
 
-    return account.dict()
 
+@traced
+async def update(id: int, request: UpdateAccount):
+    """Update account (user level)"""
+    return await _apply_update(id, request)
 
+
+@traced
 async def admin_update(id: int, request: UpdateAccountbyAdmin):
     """Update account (admin level)"""
-    account = await Accounts.find_one(Accounts.acc_no == id)
-    if not account:
-        raise HTTPException(status_code=404, detail=f"Account with id {id} not found")
-
-    update_data = request.dict(exclude_unset=True)
-    if update_data:
-        for field, value in update_data.items():
-            if field != "acc_no":  # Don't update the ID
-                setattr(account, field, value)
-        await account.save()
-        
-    return account.dict()
+    return await _apply_update(id, request)
 
 
+@traced
 async def show(id: int):
-    """Get single account"""
-    account = await Accounts.find_one(Accounts.acc_no == id)
-    if not account:
-        raise HTTPException(status_code=404, detail=f"Account with id {id} not found")
-    
-    return account.dict()
+    """Get single account as a plain projected document, served from cache when fresh"""
+    async def load():
+        account = await get_collection(Accounts).find_one({"acc_no": id}, VERSIONED_ACCOUNT_PROJECTION)
+        if not account:
+            raise HTTPException(status_code=404, detail=f"Account with id {id} not found")
+        return account
 
+    return await account_cache.get_or_load(id, load)
 
-async def deposit(id: int, amount: float):
-    """Deposit money to account"""
-    account = await Accounts.find_one(Accounts.acc_no == id)
-    if not account:
-        raise HTTPException(status_code=404, detail=f"Account with id {id} not found")
 
-    if amount <= 0:
-        raise HTTPException(status_code=400, detail="Deposit amount must be positive")
+@traced
+async def get_version_stamp(id: int):
+    """Just the acc_no and version of an account, or None when it does not exist.
 
-    account.balance += amount
-    await account.save()
-    
-    return account.dict()
+    A fresh cached copy answers without I/O; otherwise only the two fields
+    are read, so an unchanged account is never loaded in full.
+    """
+    account = await account_cache.peek(id)
+    if account is not None:
+        return account
+    return await get_collection(Accounts).find_one({"acc_no": id}, {"_id": 0, "acc_no": 1, "version": 1})
 
 
-async def withdraw(id: int, amount: float):
-    """Withdraw money from account"""
-    account = await Accounts.find_one(Accounts.acc_no == id)
+@traced
+async def deposit(id: int, amount: float):
+    """Deposit money to account in a single atomic update"""
+    if amount <= 0:
+        raise HTTPException(status_code=400, detail="Deposit amount must be positive")
+
+    account = await Accounts.find_one(Accounts.acc_no == id).update(
+        Inc({Accounts.balance: amount, Accounts.version: 1}),
+        response_type=UpdateResponse.NEW_DOCUMENT
+    )
     if not account:
         raise HTTPException(status_code=404, detail=f"Account with id {id} not found")
 
+    await _invalidate(account.acc_no, account.user_id)
+    await journal.record(account, "deposit", amount)
+    return account.model_dump()
+
+
+@traced
+async def withdraw(id: int, amount: float):
+    """Withdraw money from account in a single atomic update guarded by the balance"""
     if amount <= 0:
         raise HTTPException(status_code=400, detail="Withdrawal amount must be positive")
-        
-    if amount > account.balance:
+
+    account = await Accounts.find_one(
+        Accounts.acc_no == id,
+        Accounts.balance >= amount
+    ).update(
+        Inc({Accounts.balance: -amount, Accounts.version: 1}),
+        response_type=UpdateResponse.NEW_DOCUMENT
+    )
+    if not account:
+        # Only the failure path pays for a second round trip to tell the two cases apart
+        if not await Accounts.find_one(Accounts.acc_no == id):
+            raise HTTPException(status_code=404, detail=f"Account with id {id} not found")
         raise HTTPException(status_code=400, detail="Insufficient funds for withdrawal")
 
-    account.balance -= amount
-    await account.save()
-    
-    return account.dict()
\ No newline at end of file
+    await _invalidate(account.acc_no, account.user_id)
+    await journal.record(account, "withdraw", amount)
+    return account.model_dump()
+
+
+@traced
+async def get_transactions(id: int):
+    """Get the transaction journal for an account, newest first"""
+    return await get_collection(Transactions).find(
+        {"acc_no": id}, TRANSACTION_PROJECTION
+    ).sort("created_at", -1).to_list(None)
+
+
+def _batch_update(acc_no: int, ops, outcome_field: str):
+    """Pipeline update applying one account's operations in order, in a single write.
+
+    Each withdrawal is guarded against the running balance. The per-operation
+    post-image balances (None where a withdrawal was refused) and the new
+    version are left under ``outcome_field`` for the batch to read back.
+    """
+    steps = [{"delta": op.amount if op.txn_type == "deposit" else -op.amount,
+              "withdraw": op.txn_type == "withdraw", "amount": op.amount} for op in ops]
+    applied = {"$add": ["$$value.balance", "$$this.delta"]}
+    outcome = {"$reduce": {
+        "input": {"$literal": steps},
+        "initialValue": {"balance": "$balance", "after": []},
+        "in": {"$cond": [
+            {"$or": [{"$not": ["$$this.withdraw"]}, {"$gte": ["$$value.balance", "$$this.amount"]}]},
+            {"balance": applied, "after": {"$concatArrays": ["$$value.after", [applied]]}},
+            {"balance": "$$value.balance", "after": {"$concatArrays": ["$$value.after", [None]]}}
+        ]}
+    }}
+    applied_count = {"$size": {"$filter": {
+        "input": f"${outcome_field}.after", "cond": {"$ne": ["$$this", None]}
+    }}}
+    version = {"$add": [{"$ifNull": ["$version", 0]}, applied_count]}
+    return UpdateOne({"acc_no": acc_no}, [
+        {"$set": {outcome_field: outcome}},
+        {"$set": {
+            "balance": f"${outcome_field}.balance",
+            "version": version,
+            outcome_field: {"balance_after": f"${outcome_field}.after", "version": version}
+        }}
+    ])
+
+
+def _batch_result(index: int, op, error_code=None, balance_after=None):
+    return {
+        "index": index,
+        "acc_no": op.acc_no,
+        "txn_type": op.txn_type,
+        "amount": op.amount,
+        "status": "error" if error_code else "ok",
+        "error_code": error_code,
+        "balance_after": balance_after
+    }
+
+
+@traced
+async def batch_transactions(operations):
+    """Apply many deposits and withdrawals in three round trips, whatever the batch size.
+
+    Operations on the same account are merged into one pipeline update that
+    applies them in request order, and all the updates go out in a single
+    unordered bulk_write. Each update leaves its outcomes under a key unique
+    to this batch; one read collects them and one update_many removes them.
+    """
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch may contain at most {MAX_BATCH_OPERATIONS} operations"
+        )
+
+    results = [None] * len(operations)
+    by_account = defaultdict(list)
+    for index, op in enumerate(operations):
+        if op.amount <= 0:
+            results[index] = _batch_result(index, op, "invalid_amount")
+            continue
+        by_account[op.acc_no].append(index)
+
+    collection = get_collection(Accounts)
+    batch_id = uuid4().hex
+    # A top-level field, so unsetting it leaves nothing behind on the account
+    outcome_field = f"pending_batch_{batch_id}"
+    acc_nos = list(by_account)
+    write_errors = set()
+    accounts = {}
+
+    if acc_nos:
+        try:
+            await collection.bulk_write(
+                [_batch_update(acc_no, [operations[index] for index in indexes], outcome_field)
+                 for acc_no, indexes in by_account.items()],
+                ordered=False
+            )
+        except BulkWriteError as e:
+            write_errors = {acc_nos[error["index"]] for error in e.details.get("writeErrors", [])}
+
+        accounts = {
+            account["acc_no"]: account
+            async for account in collection.find(
+                {"acc_no": {"$in": acc_nos}},
+                projection={"acc_no": 1, "user_id": 1, outcome_field: 1},
+                batch_size=len(acc_nos)
+            )
+        }
+
+        try:
+            await collection.update_many(
+                {"acc_no": {"$in": acc_nos}, outcome_field: {"$exists": True}},
+                {"$unset": {outcome_field: ""}}
+            )
+        except PyMongoError as e:
+            # The balances are already applied; a leftover outcome key is harmless
+            print(f"⚠️  Could not clear batch {batch_id} outcomes: {e}")
+
+    entries = []
+    for acc_no, indexes in by_account.items():
+        account = accounts.get(acc_no)
+        outcome = (account or {}).get(outcome_field)
+        if outcome is None:
+            if acc_no in write_errors:
+                error_code = "write_error"
+            elif account is None:
+                error_code = "account_not_found"
+            else:
+                error_code = "not_applied"
+            for index in indexes:
+                results[index] = _batch_result(index, operations[index], error_code)
+            continue
+
+        # Each applied operation bumped the version once, in order
+        applied = [balance_after for balance_after in outcome["balance_after"] if balance_after is not None]
+        version = outcome["version"] - len(applied)
+        for index, balance_after in zip(indexes, outcome["balance_after"]):
+            op = operations[index]
+            if balance_after is None:
+                results[index] = _batch_result(index, op, "insufficient_funds")
+                continue
+            version += 1
+            results[index] = _batch_result(index, op, balance_after=balance_after)
+            entries.append(Transactions(
+                acc_no=acc_no,
+                user_id=account["user_id"],
+                txn_type=op.txn_type,
+                amount=op.amount,
+                balance_after=balance_after,
+                version=version
+            ))
+        if applied:
+            await _invalidate(acc_no, account["user_id"])
+
+    await journal.record_many(entries)
+
+    succeeded = sum(1 for result in results if result["status"] == "ok")
+    return {
+        "results": results,
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded
+    }
+
+
+@traced
+async def transfer(from_id: int, to_id: int, amount: float, current_user: dict):
+    """Move money between two accounts inside a single multi-document transaction.
+
+    Users may only move money out of their own accounts; admins may move it out of any.
+    """
+    if amount <= 0:
+        raise HTTPException(status_code=400, detail="Transfer amount must be positive")
+    if from_id == to_id:
+        raise HTTPException(status_code=400, detail="Cannot transfer to the same account")
+
+    collection = get_collection(Accounts)
+    # Touch accounts in a fixed order (lower account number first). Concurrent transfers
+    # over the same account do not queue on it: the later writer aborts with a
+    # WriteConflict, which with_transaction retries as a TransientTransactionError
+    legs = sorted([(from_id, -amount), (to_id, amount)])
+
+    async def apply(session):
+        updated = {}
+        for acc_no, delta in legs:
+            query = {"acc_no": acc_no}
+            if delta < 0:
+                query["balance"] = {"$gte": amount}
+                if current_user["role"] != "admin":
+                    query["user_id"] = current_user["user_id"]
+
+            account = await collection.find_one_and_update(
+                query,
+                {"$inc": {"balance": delta, "version": 1}},
+                projection=VERSIONED_ACCOUNT_PROJECTION,
+                session=session,
+                return_document=ReturnDocument.AFTER
+            )
+            if account is None:
+                existing = await collection.find_one({"acc_no": acc_no}, {"user_id": 1}, session=session)
+                if not existing:
+                    raise HTTPException(status_code=404, detail=f"Account with id {acc_no} not found")
+                if "user_id" in query and existing["user_id"] != query["user_id"]:
+                    raise HTTPException(status_code=403, detail="You can only transfer from your own accounts")
+                raise HTTPException(status_code=400, detail="Insufficient funds for transfer")
+            updated[acc_no] = account
+        return updated
+
+    # with_transaction retries the whole callback on TransientTransactionError
+    # and retries the commit on UnknownTransactionCommitResult
+    async with await client.start_session() as session:
+        updated = await session.with_transaction(
+            apply,
+            read_concern=ReadConcern("snapshot"),
+            write_concern=WriteConcern("majority")
+        )
+
+    source, target = updated[from_id], updated[to_id]
+    await _invalidate(from_id, source["user_id"])
+    await _invalidate(to_id, target["user_id"])
+    await journal.record_many([
+        Transactions(acc_no=from_id, user_id=source["user_id"], txn_type="transfer_out",
+                     amount=amount, balance_after=source["balance"], version=source["version"]),
+        Transactions(acc_no=to_id, user_id=target["user_id"], txn_type="transfer_in",
+                     amount=amount, balance_after=target["balance"], version=target["version"]),
+    ])
+
+    return {
+        "amount": amount,
+        "from_account": source,
+        "to_account": target
+    }
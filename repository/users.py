@@ -1,25 +1,71 @@
+from collections import defaultdict
+
 from fastapi import HTTPException, status
+from beanie import UpdateResponse
+from beanie.odm.operators.update.general import Inc, Set
 from models import Accounts, Users
 from schemas import CreateUser as User, ShowUser
-from security import get_password_hash
+from security import get_password_hash_async
 from pymongo.errors import DuplicateKeyError
+from database import get_collection
+from pagination import keyset_page, keyset_cursor
+from streaming import STREAM_BATCH_SIZE
+from cache import account_cache, profile_cache
+from tracing import traced
+from projections import ACCOUNT_PROJECTION, VERSIONED_ACCOUNT_PROJECTION, USER_PROJECTION, PROFILE_PROJECTION
 
+# Enough of a user and their accounts to compute the ETag
+VERSION_STAMP_PROJECTION = {"_id": 0, "user_id": 1, "version": 1}
+ACCOUNT_VERSION_PROJECTION = {"_id": 0, "acc_no": 1, "version": 1}
+
+
+async def _attach_accounts(users, all_users: bool = False):
+    """Fetch the accounts for a batch of users in one query instead of one per user"""
+    if not users:
+        return users
+    query = {} if all_users else {"user_id": {"$in": [user["user_id"] for user in users]}}
+
+    accounts_by_user = defaultdict(list)
+    async for account in get_collection(Accounts).find(query, ACCOUNT_PROJECTION):
+        accounts_by_user[account["user_id"]].append(account)
 
-async def get_all_users():
-    """Get all users with their accounts"""
-    users = await Users.find_all().to_list()
-    result = []
-    
     for user in users:
-        # Get accounts for this user
-        accounts = await Accounts.find(Accounts.user_id == user.user_id).to_list()
-        user_dict = user.dict()
-        user_dict["accounts"] = [account.dict() for account in accounts]
-        result.append(user_dict)
+        user["accounts"] = accounts_by_user[user["user_id"]]
+    return users
+
+
+@traced
+async def get_all_users(limit=None, after=None):
+    """Get users ordered by user_id with their accounts, one keyset page at a time"""
+    users, next_cursor = await keyset_page(
+        get_collection(Users), "user_id", limit, after, USER_PROJECTION
+    )
+    await _attach_accounts(users, all_users=limit is None and after is None)
     
-    return result
+    return users, next_cursor
 
 
+def stream_all_users(after=None):
+    """Iterate users after the cursor with their accounts, one cursor batch at a time"""
+    users = keyset_cursor(
+        get_collection(Users), "user_id", after, USER_PROJECTION
+    ).batch_size(STREAM_BATCH_SIZE)
+
+    async def iterate():
+        batch = []
+        async for user in users:
+            batch.append(user)
+            if len(batch) >= STREAM_BATCH_SIZE:
+                for user_with_accounts in await _attach_accounts(batch):
+                    yield user_with_accounts
+                batch = []
+        for user_with_accounts in await _attach_accounts(batch):
+            yield user_with_accounts
+
+    return iterate()
+
+
+@traced
 async def create_user_with_account(request: User):
     """Create a new user"""
     # Get next auto-increment ID
@@ -28,7 +74,7 @@ async def create_user_with_account(request: User):
     new_user = Users(
         user_id=next_id,
         username=request.username,
-        hashed_password=get_password_hash(request.hashed_password),
+        hashed_password=await get_password_hash_async(request.hashed_password),
         email=request.email,
         mob_no=request.mob_no,
         role=request.role,
@@ -36,7 +82,7 @@ async def create_user_with_account(request: User):
 
     try:
         await new_user.insert()
-        return new_user.dict()
+        return new_user.model_dump()
     except DuplicateKeyError as e:
         if "username" in str(e):
             raise HTTPException(
@@ -60,40 +106,73 @@ async def create_user_with_account(request: User):
             )
 
 
+def _user_with_accounts(user_id: int, user_projection: dict, extra_fields=None,
+                        account_projection=VERSIONED_ACCOUNT_PROJECTION):
+    """Pipeline returning one user with their projected accounts joined in"""
+    return [
+        {"$match": {"user_id": user_id}},
+        {"$limit": 1},
+        {"$lookup": {
+            "from": Accounts.Settings.name,
+            "localField": "user_id",
+            "foreignField": "user_id",
+            "pipeline": [{"$sort": {"acc_no": 1}}, {"$project": account_projection}],
+            "as": "accounts"
+        }},
+        {"$project": {**user_projection, "version": 1, "accounts": 1, **(extra_fields or {})}}
+    ]
+
+
+@traced
 async def get_user_by_id(user_id: int):
-    """Get user by ID with their accounts"""
-    user = await Users.find_one(Users.user_id == user_id)
-    if not user:
+    """Get user by ID with their accounts in one round trip"""
+    users = await get_collection(Users).aggregate(
+        _user_with_accounts(user_id, USER_PROJECTION)
+    ).to_list(None)
+    if not users:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Get accounts for this user
-    accounts = await Accounts.find(Accounts.user_id == user.user_id).to_list()
-    user_dict = user.dict()
-    user_dict["accounts"] = [account.dict() for account in accounts]
-    
-    return user_dict
+    return users[0]
 
 
+@traced
 async def get_user_profile(user_id: int):
-    """Get user profile with detailed account information - optimized for profile view"""
-    user = await Users.find_one(Users.user_id == user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    # Get accounts for this user with additional profile information
-    accounts = await Accounts.find(Accounts.user_id == user.user_id).to_list()
-    
-    # Calculate total balance across all accounts
-    total_balance = sum(account.balance for account in accounts)
-    
-    user_dict = user.dict()
-    user_dict["accounts"] = [account.dict() for account in accounts]
-    user_dict["total_balance"] = total_balance
-    user_dict["total_accounts"] = len(accounts)
-    
-    return user_dict
+    """Get user profile with its accounts and totals computed by one aggregation, served from cache when fresh"""
+    async def load():
+        profiles = await get_collection(Users).aggregate(_user_with_accounts(
+            user_id,
+            PROFILE_PROJECTION,
+            {
+                "total_balance": {"$sum": "$accounts.balance"},
+                "total_accounts": {"$size": "$accounts"}
+            }
+        )).to_list(None)
+        if not profiles:
+            raise HTTPException(status_code=404, detail="User not found")
+        return profiles[0]
 
+    return await profile_cache.get_or_load(user_id, load)
 
+
+@traced
+async def get_version_stamp(user_id: int, cached: bool = False):
+    """Versions of a user and their accounts, or None when the user does not exist.
+
+    With ``cached`` a fresh cached profile answers without I/O; otherwise one
+    aggregation reads only the ids and versions, never the full documents.
+    """
+    if cached:
+        profile = await profile_cache.peek(user_id)
+        if profile is not None:
+            return profile
+
+    users = await get_collection(Users).aggregate(_user_with_accounts(
+        user_id, VERSION_STAMP_PROJECTION, account_projection=ACCOUNT_VERSION_PROJECTION
+    )).to_list(None)
+    return users[0] if users else None
+
+
+@traced
 async def delete_user(user_id: int):
     """Delete user and cascade delete their accounts"""
     user = await Users.find_one(Users.user_id == user_id)
@@ -101,31 +180,40 @@ async def delete_user(user_id: int):
         raise HTTPException(status_code=404, detail=f"User with id {user_id} not found")
     
     # Delete all accounts for this user (cascade delete)
+    acc_nos = await get_collection(Accounts).distinct("acc_no", {"user_id": user.user_id})
     await Accounts.find(Accounts.user_id == user.user_id).delete()
     
     # Delete the user
     await user.delete()
+    await account_cache.invalidate(*acc_nos)
+    await profile_cache.invalidate(user.user_id)
     return {"message": "User deleted successfully"}
 
 
+@traced
 async def update_user(user_id: int, request: User):
     """Update user details"""
-    user = await Users.find_one(Users.user_id == user_id)
-    if not user:
+    if not await Users.find_one(Users.user_id == user_id):
         raise HTTPException(status_code=404, detail=f"User with id {user_id} not found")
 
     # Update user fields
-    update_data = request.dict(exclude_unset=True)
+    update_data = request.model_dump(exclude_unset=True)
+    update_data.pop("user_id", None)  # Don't update the ID
     if "hashed_password" in update_data:
-        update_data["hashed_password"] = get_password_hash(update_data["hashed_password"])
+        update_data["hashed_password"] = await get_password_hash_async(update_data["hashed_password"])
     
     try:
-        for field, value in update_data.items():
-            if field != "user_id":  # Don't update the ID
-                setattr(user, field, value)
-        await user.save()
+        # Changed fields and the version bump land in one atomic update
+        user = await Users.find_one(Users.user_id == user_id).update(
+            Set(update_data),
+            Inc({Users.version: 1}),
+            response_type=UpdateResponse.NEW_DOCUMENT
+        )
+        if not user:
+            raise HTTPException(status_code=404, detail=f"User with id {user_id} not found")
+        await profile_cache.invalidate(user.user_id)
         
-        return user.dict()
+        return user.model_dump()
     except DuplicateKeyError as e:
         if "username" in str(e):
             raise HTTPException(
@@ -0,0 +1,29 @@
+from typing import List
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from schemas import ShowAccount, ShowTransaction, ShowUser, ShowUserProfile
+
+# Built once at import; building a TypeAdapter per request would dominate small responses
+ACCOUNT = TypeAdapter(ShowAccount)
+ACCOUNT_LIST = TypeAdapter(List[ShowAccount])
+TRANSACTION_LIST = TypeAdapter(List[ShowTransaction])
+USER = TypeAdapter(ShowUser)
+USER_LIST = TypeAdapter(List[ShowUser])
+USER_PROFILE = TypeAdapter(ShowUserProfile)
+
+
+def model_response(adapter: TypeAdapter, data, status_code: int = 200, headers=None) -> Response:
+    """Validate plain data against a response schema once and encode it straight to JSON.
+
+    Returning a Response skips FastAPI's own response_model pass (validate,
+    dump to Python, then encode), so routes keep ``response_model`` for the
+    OpenAPI docs only.
+    """
+    return Response(
+        content=adapter.dump_json(adapter.validate_python(data)),
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json"
+    )
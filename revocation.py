@@ -0,0 +1,145 @@
+import asyncio
+import math
+import os
+from datetime import datetime, timedelta
+
+from pymongo.errors import DuplicateKeyError
+
+from database import get_collection
+from models import RevokedTokens
+
+# Expected number of live revocations; the filter is resized on rebuild if exceeded
+REVOCATION_FILTER_CAPACITY = int(os.getenv("REVOCATION_FILTER_CAPACITY", "100000"))
+REVOCATION_FILTER_ERROR_RATE = float(os.getenv("REVOCATION_FILTER_ERROR_RATE", "0.001"))
+# How often revocations made by other workers are pulled in
+REVOCATION_SYNC_SECONDS = float(os.getenv("REVOCATION_SYNC_SECONDS", "5"))
+# How often the filter is rebuilt from scratch to drop expired entries
+REVOCATION_REBUILD_SECONDS = float(os.getenv("REVOCATION_REBUILD_SECONDS", "3600"))
+# Each sync re-reads this far behind the newest revocation seen, so an insert that
+# commits after a later-stamped one (or on a lagging clock) is still picked up
+REVOCATION_SYNC_OVERLAP_SECONDS = float(os.getenv("REVOCATION_SYNC_OVERLAP_SECONDS", "60"))
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings using double hashing"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    @staticmethod
+    def _hashes(item: str):
+        # The filter never leaves this process, so the builtin (per-process seeded) hash is enough
+        value = hash(item) & 0xFFFFFFFFFFFFFFFF
+        return value & 0xFFFFFFFF, (value >> 32) | 1
+
+    def add(self, item: str):
+        position, step = self._hashes(item)
+        for _ in range(self.hashes):
+            position = (position + step) % self.size
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits, size = self._bits, self.size
+        position, step = self._hashes(item)
+        for _ in range(self.hashes):
+            position = (position + step) % size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+class RevocationList:
+    """Revoked token IDs, checked in memory and confirmed in the database.
+
+    The Bloom filter answers "definitely not revoked" for almost every
+    request without I/O; only filter hits are confirmed against the
+    revoked_tokens collection, whose TTL index keeps it small.
+
+    Revocations are stamped with the database server's clock, and syncing
+    re-scans an overlap window behind the newest stamp seen rather than
+    trusting it as an exact watermark.
+    """
+
+    def __init__(self):
+        self.filter = BloomFilter(REVOCATION_FILTER_CAPACITY, REVOCATION_FILTER_ERROR_RATE)
+        self.false_positives = 0
+        self._watermark = None
+
+    async def revoke(self, jti: str, expires_at: datetime) -> bool:
+        """Revoke a token ID; returns False if it was already revoked"""
+        self.filter.add(jti)
+        try:
+            result = await get_collection(RevokedTokens).update_one(
+                {"jti": jti},
+                {"$setOnInsert": {"expires_at": expires_at}, "$currentDate": {"revoked_at": True}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # Two concurrent upserts of the same jti; the other one inserted it
+            return False
+        return result.upserted_id is not None
+
+    async def is_revoked(self, jti: str) -> bool:
+        if jti not in self.filter:
+            return False
+        if await get_collection(RevokedTokens).find_one({"jti": jti}, {"_id": 1}):
+            return True
+        self.false_positives += 1
+        return False
+
+    async def rebuild(self):
+        """Reload every live revocation into a fresh, right-sized filter"""
+        live = await get_collection(RevokedTokens).count_documents({})
+        fresh = BloomFilter(max(REVOCATION_FILTER_CAPACITY, live * 2), REVOCATION_FILTER_ERROR_RATE)
+        watermark = self._watermark
+        async for revoked in get_collection(RevokedTokens).find({}, {"jti": 1, "revoked_at": 1}):
+            fresh.add(revoked["jti"])
+            if watermark is None or revoked["revoked_at"] > watermark:
+                watermark = revoked["revoked_at"]
+        self.filter = fresh
+        self._watermark = watermark
+
+    async def sync(self):
+        """Add revocations made by other workers since the last sync (minus the overlap window)"""
+        query = {} if self._watermark is None else {
+            "revoked_at": {"$gte": self._watermark - timedelta(seconds=REVOCATION_SYNC_OVERLAP_SECONDS)}
+        }
+        async for revoked in get_collection(RevokedTokens).find(query, {"jti": 1, "revoked_at": 1}):
+            # The overlap re-reads recent revocations; adding them again would only inflate the count
+            if revoked["jti"] not in self.filter:
+                self.filter.add(revoked["jti"])
+            if self._watermark is None or revoked["revoked_at"] > self._watermark:
+                self._watermark = revoked["revoked_at"]
+
+    async def run(self):
+        """Background task keeping the filter in step with the collection"""
+        since_rebuild = None
+        while True:
+            try:
+                if since_rebuild is None or since_rebuild >= REVOCATION_REBUILD_SECONDS:
+                    await self.rebuild()
+                    since_rebuild = 0.0
+                else:
+                    await self.sync()
+            except Exception as e:
+                print(f"⚠️  Revocation sync failed: {e}")
+            await asyncio.sleep(REVOCATION_SYNC_SECONDS)
+            if since_rebuild is not None:
+                since_rebuild += REVOCATION_SYNC_SECONDS
+
+    def stats(self) -> dict:
+        return {
+            "filter_bits": self.filter.size,
+            "filter_hashes": self.filter.hashes,
+            "filter_entries": self.filter.count,
+            "filter_capacity": self.filter.capacity,
+            "false_positives": self.false_positives,
+        }
+
+
+revocations = RevocationList()
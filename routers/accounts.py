@@ -1,21 +1,53 @@
-from fastapi import APIRouter, Depends, status, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, Request, status, HTTPException, Query
+from fastapi.responses import ORJSONResponse
+from typing import List, Optional
 
 from repository import accounts as accounts_repo
-from schemas import ShowAccount, UpdateAccountbyUser, UpdateAccountbyAdmin, CreateAccount
+from schemas import (
+    ShowAccount, ShowTransaction, UpdateAccountbyUser, UpdateAccountbyAdmin, CreateAccount,
+    BatchTransactionRequest, BatchTransactionResult, TransferRequest, TransferResult
+)
+from pagination import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
+from streaming import stream_response, wants_ndjson
+from responses import model_response, ACCOUNT, ACCOUNT_LIST, TRANSACTION_LIST
+from etags import account_etag, conditional_response
 from auth import admin_only, get_current_user, user_or_admin, user_only 
 
-router = APIRouter(prefix="/accounts", tags=["Accounts"])
+router = APIRouter(prefix="/accounts", tags=["Accounts"], default_response_class=ORJSONResponse)
 
 
 @router.get("/", status_code=200, response_model=List[ShowAccount])
-async def all(current_user=Depends(admin_only)):
-    return await accounts_repo.get_all()
+async def all(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    stream: bool = False,
+    current_user=Depends(admin_only)
+):
+    # Full exports stream straight off the cursor instead of building the list in memory
+    if stream or wants_ndjson(request):
+        return stream_response(accounts_repo.stream_all(after), ACCOUNT, ndjson=wants_ndjson(request))
+
+    accounts, next_cursor = await accounts_repo.get_all(limit, after)
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return model_response(ACCOUNT_LIST, accounts, headers=headers)
 
 
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=ShowAccount)
 async def create(request: CreateAccount, current_user=Depends(user_or_admin)):
-    return await accounts_repo.create(request, current_user)    
+    return model_response(ACCOUNT, await accounts_repo.create(request, current_user), status.HTTP_201_CREATED)
+
+
+@router.post("/batch", status_code=status.HTTP_200_OK, response_model=BatchTransactionResult)
+async def batch(request: BatchTransactionRequest, current_user=Depends(admin_only)):
+    """Apply many deposits and withdrawals in one call with per-item results"""
+    return await accounts_repo.batch_transactions(request.operations)
+
+
+@router.post("/transfer", status_code=status.HTTP_200_OK, response_model=TransferResult)
+async def transfer(request: TransferRequest, current_user=Depends(user_or_admin)):
+    """Atomically move money from one account to another"""
+    return await accounts_repo.transfer(request.from_acc_no, request.to_acc_no, request.amount, current_user)
 
 
 @router.delete("/{id}", status_code=status.HTTP_200_OK)
@@ -25,17 +57,21 @@ async def destroy(id: int, current_user=Depends(admin_only)):
 
 @router.patch("/{id}", status_code=status.HTTP_202_ACCEPTED, response_model=ShowAccount)
 async def update(id: int, request: UpdateAccountbyUser, current_user=Depends(user_only)):
-    return await accounts_repo.update(id, request)
+    return model_response(ACCOUNT, await accounts_repo.update(id, request), status.HTTP_202_ACCEPTED)
 
 
 @router.put("/{id}/admin", status_code=status.HTTP_202_ACCEPTED, response_model=ShowAccount)
 async def admin_update(id: int, request: UpdateAccountbyAdmin, current_user=Depends(admin_only)):
-    return await accounts_repo.admin_update(id, request)  
+    return model_response(ACCOUNT, await accounts_repo.admin_update(id, request), status.HTTP_202_ACCEPTED)
 
 
 @router.get("/{id}", status_code=200, response_model=ShowAccount)
-async def show(id: int, current_user=Depends(user_or_admin)):
-    return await accounts_repo.show(id)
+async def show(id: int, request: Request, current_user=Depends(user_or_admin)):
+    return await conditional_response(
+        request, ACCOUNT, account_etag,
+        load=lambda: accounts_repo.show(id),
+        load_stamp=lambda: accounts_repo.get_version_stamp(id)
+    )
 
 
 @router.post("/{id}/deposit", status_code=status.HTTP_200_OK, response_model=ShowAccount)
@@ -45,7 +81,7 @@ async def deposit(id: int, amount: float, current_user=Depends(user_or_admin)):
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Deposit amount must be greater than zero."
         )
-    return await accounts_repo.deposit(id, amount)
+    return model_response(ACCOUNT, await accounts_repo.deposit(id, amount))
 
 
 @router.post("/{id}/withdraw", status_code=status.HTTP_200_OK, response_model=ShowAccount)
@@ -55,4 +91,9 @@ async def withdraw(id: int, amount: float, current_user=Depends(user_or_admin)):
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Withdrawal amount must be greater than zero."
         )
-    return await accounts_repo.withdraw(id, amount)
\ No newline at end of file
+    return model_response(ACCOUNT, await accounts_repo.withdraw(id, amount))
+
+
+@router.get("/{id}/transactions", status_code=200, response_model=List[ShowTransaction])
+async def transactions(id: int, current_user=Depends(user_or_admin)):
+    return model_response(TRANSACTION_LIST, await accounts_repo.get_transactions(id))
@@ -0,0 +1,63 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from auth import admin_only
+from cache import caches
+from admission import login_admission
+from revocation import revocations
+from journal import journal
+from loop_monitor import loop_monitor
+from profiling import profiles
+from database import client_settings
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+
+@router.get("/cache", status_code=200)
+async def cache_stats(current_user=Depends(admin_only)):
+    """Hit/miss counters and occupancy for each read cache"""
+    return {name: cache.stats() for name, cache in caches.items()}
+
+
+@router.get("/login-admission", status_code=200)
+async def login_admission_stats(current_user=Depends(admin_only)):
+    """Queue depth, in-flight verifications and shed counts for /login"""
+    return login_admission.stats()
+
+
+@router.get("/database", status_code=200)
+async def database_settings(current_user=Depends(admin_only)):
+    """Effective MongoDB client pool, timeout and compression settings"""
+    return client_settings()
+
+
+@router.get("/revocations", status_code=200)
+async def revocation_stats(current_user=Depends(admin_only)):
+    """Size and false-positive count of the token revocation filter"""
+    return revocations.stats()
+
+
+@router.get("/journal", status_code=200)
+async def journal_stats(current_user=Depends(admin_only)):
+    """Journal entries queued for the next group commit or waiting for a retry"""
+    return journal.stats()
+
+
+@router.get("/event-loop", status_code=200)
+async def event_loop_stats(current_user=Depends(admin_only)):
+    """Current and worst event-loop lag, with stacks of recent stalls"""
+    return loop_monitor.stats()
+
+
+@router.get("/profiles", status_code=200)
+async def list_profiles(current_user=Depends(admin_only)):
+    """Summaries of recent profiled requests, newest first"""
+    return [summary for summary, _ in reversed(profiles.values())]
+
+
+@router.get("/profiles/{profile_id}", response_class=PlainTextResponse)
+async def download_profile(profile_id: str, current_user=Depends(admin_only)):
+    """Collapsed stacks and allocation summary of one profiled request"""
+    if profile_id not in profiles:
+        raise HTTPException(status_code=404, detail=f"Profile {profile_id} not found")
+    return profiles[profile_id][1]
@@ -1,31 +1,57 @@
-from fastapi import APIRouter, Depends, status
-from typing import List
+from fastapi import APIRouter, Depends, Request, status, Query
+from fastapi.responses import ORJSONResponse
+from typing import List, Optional
 from repository import users as users_repo
 from schemas import ShowUser, ShowUserProfile, CreateUser as User
+from pagination import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
+from streaming import stream_response, wants_ndjson
+from responses import model_response, USER, USER_LIST, USER_PROFILE
+from etags import user_etag, conditional_response
 from auth import admin_only, get_current_user, user_or_admin, user_only
 
-router = APIRouter(prefix="/users", tags=["Users"])
+router = APIRouter(prefix="/users", tags=["Users"], default_response_class=ORJSONResponse)
 
 
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=ShowUser)
 async def create(request: User):
-    return await users_repo.create_user_with_account(request)  
+    return model_response(USER, await users_repo.create_user_with_account(request), status.HTTP_201_CREATED)
 
 
 @router.get("/profile", status_code=200, response_model=ShowUserProfile)
-async def get_my_profile(current_user=Depends(get_current_user)):
+async def get_my_profile(request: Request, current_user=Depends(get_current_user)):
     """Get current user's profile with all associated accounts and summary info"""
-    return await users_repo.get_user_profile(current_user["user_id"])
+    user_id = current_user["user_id"]
+    return await conditional_response(
+        request, USER_PROFILE, user_etag,
+        load=lambda: users_repo.get_user_profile(user_id),
+        load_stamp=lambda: users_repo.get_version_stamp(user_id, cached=True)
+    )
 
 
 @router.get("/", status_code=200, response_model=List[ShowUser])
-async def all(current_user=Depends(admin_only)):
-    return await users_repo.get_all_users()  
+async def all(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    stream: bool = False,
+    current_user=Depends(admin_only)
+):
+    # Full exports stream straight off the cursor instead of building the list in memory
+    if stream or wants_ndjson(request):
+        return stream_response(users_repo.stream_all_users(after), USER, ndjson=wants_ndjson(request))
+
+    users, next_cursor = await users_repo.get_all_users(limit, after)
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return model_response(USER_LIST, users, headers=headers)
 
 
 @router.get("/{user_id}", status_code=200, response_model=ShowUser)
-async def get_user(user_id: int, current_user=Depends(user_or_admin)):
-    return await users_repo.get_user_by_id(user_id)
+async def get_user(user_id: int, request: Request, current_user=Depends(user_or_admin)):
+    return await conditional_response(
+        request, USER, user_etag,
+        load=lambda: users_repo.get_user_by_id(user_id),
+        load_stamp=lambda: users_repo.get_version_stamp(user_id)
+    )
 
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -35,4 +61,4 @@ async def delete_user(user_id: int, current_user=Depends(admin_only)):
 
 @router.put("/{user_id}", status_code=status.HTTP_202_ACCEPTED, response_model=ShowUser)
 async def update_user(user_id: int, request: User, current_user=Depends(user_or_admin)):
-    return await users_repo.update_user(user_id, request)
\ No newline at end of file
+    return model_response(USER, await users_repo.update_user(user_id, request), status.HTTP_202_ACCEPTED)
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional
+from typing import List, Literal, Optional
 from datetime import datetime
 
 
@@ -76,6 +76,58 @@ class ShowUserProfile(BaseModel):
     total_accounts: Optional[int] = 0
 
 
+class ShowTransaction(BaseModel):
+    acc_no: int
+    user_id: int
+    txn_type: str
+    amount: float
+    balance_after: float
+    created_at: datetime
+
+
+class BatchOperation(BaseModel):
+    acc_no: int
+    txn_type: Literal["deposit", "withdraw"]
+    amount: float
+
+
+class BatchTransactionRequest(BaseModel):
+    operations: List[BatchOperation]
+
+
+class BatchOperationResult(BaseModel):
+    index: int  # Position of the operation in the request
+    acc_no: int
+    txn_type: str
+    amount: float
+    status: str  # "ok" or "error"
+    error_code: Optional[str] = None
+    balance_after: Optional[float] = None
+
+
+class BatchTransactionResult(BaseModel):
+    results: List[BatchOperationResult]
+    succeeded: int
+    failed: int
+
+
+class TransferRequest(BaseModel):
+    from_acc_no: int
+    to_acc_no: int
+    amount: float
+
+
+class TransferResult(BaseModel):
+    amount: float
+    from_account: ShowAccount
+    to_account: ShowAccount
+
+
 class Token(BaseModel):
     access_token: str
-    token_type: str
\ No newline at end of file
+    token_type: str
+    refresh_token: Optional[str] = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
\ No newline at end of file
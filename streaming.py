@@ -0,0 +1,47 @@
+import os
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Documents fetched per cursor batch and bytes buffered per chunk written;
+# together they bound worker memory regardless of collection size
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "500"))
+STREAM_CHUNK_BYTES = int(os.getenv("STREAM_CHUNK_BYTES", "65536"))
+
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+async def _chunks(documents, adapter, ndjson: bool):
+    buffer = bytearray() if ndjson else bytearray(b"[")
+    separator = b"\n" if ndjson else b","
+    first = True
+    async for document in documents:
+        if not ndjson and not first:
+            buffer += separator
+        buffer += adapter.dump_json(adapter.validate_python(document))
+        if ndjson:
+            buffer += separator
+        first = False
+        if len(buffer) >= STREAM_CHUNK_BYTES:
+            yield bytes(buffer)
+            buffer.clear()
+    if not ndjson:
+        buffer += b"]"
+    if buffer:
+        yield bytes(buffer)
+
+
+def stream_response(documents, adapter, ndjson: bool) -> StreamingResponse:
+    """Stream documents from an async iterator as a JSON array or as NDJSON.
+
+    Each document is validated against ``adapter`` (the item schema) and
+    encoded as it arrives, so nothing but the current chunk is held in memory.
+    """
+    return StreamingResponse(
+        _chunks(documents, adapter, ndjson),
+        media_type=NDJSON_MEDIA_TYPE if ndjson else "application/json"
+    )
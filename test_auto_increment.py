@@ -4,7 +4,7 @@ Test script to verify auto-increment IDs work correctly
 
 import asyncio
 from database import init_db
-from models import Users, Accounts, Counter
+from models import Users, Accounts, Counter, user_ids as user_id_allocator, account_ids as account_id_allocator
 from security import get_password_hash
 
 
@@ -20,6 +20,8 @@ async def test_auto_increment():
     await Users.delete_all()
     await Accounts.delete_all()
     await Counter.delete_all()
+    user_id_allocator.reset()
+    account_id_allocator.reset()
     print("🧹 Cleared existing data")
     
     print("\n" + "="*50)
@@ -107,6 +109,17 @@ async def test_auto_increment():
     else:
         print(f"❌ Account IDs are NOT sequential. Got: {account_ids}")
 
+    print("\n" + "="*50)
+    print("⚡ Testing Concurrent ID Allocation")
+    print("="*50)
+
+    # Many concurrent creates must never be handed the same ID
+    concurrent_ids = await asyncio.gather(*[Accounts.get_next_id() for _ in range(500)])
+    if len(set(concurrent_ids)) == len(concurrent_ids) and min(concurrent_ids) > max(account_ids):
+        print(f"✅ {len(concurrent_ids)} concurrent IDs are unique")
+    else:
+        print("❌ Concurrent allocation handed out duplicate or reused IDs")
+
 
 if __name__ == "__main__":
     print("🏦 Bank System - Auto-Increment ID Test")
@@ -0,0 +1,119 @@
+"""
+Test script to verify list endpoints issue a constant number of database commands
+and single-document reads stay within their round-trip budgets
+"""
+
+import asyncio
+
+from database import init_db
+from models import Users, Accounts
+from repository import users as users_repo
+from repository import accounts as accounts_repo
+from cache import caches
+from querylog import track_db
+
+# Test users live far above real user IDs and are removed afterwards
+BASE_USER_ID = 8_000_000
+
+
+async def seed_users(count: int):
+    await cleanup()
+    for i in range(count):
+        await Users(
+            user_id=BASE_USER_ID + i,
+            username=f"count_user{i}",
+            email=f"count_user{i}@test.com",
+            mob_no=8_000_000_000 + i,
+            hashed_password="not-a-real-hash",
+        ).insert()
+        for j in range(2):
+            await Accounts(
+                acc_no=BASE_USER_ID + i * 2 + j,
+                acc_holder_name=f"Count Holder {i}",
+                acc_holder_address="Count Street",
+                dob="1990-01-01",
+                gender="Other",
+                acc_type="Savings",
+                user_id=BASE_USER_ID + i
+            ).insert()
+
+
+async def cleanup():
+    await Users.find(Users.user_id >= BASE_USER_ID).delete()
+    await Accounts.find(Accounts.user_id >= BASE_USER_ID).delete()
+
+
+async def commands_for(call) -> int:
+    """Commands issued by call(); getMore is skipped since it grows with result size, not users"""
+    with track_db() as stats:
+        await call()
+    return sum(1 for command, _, _ in stats.commands if command != "getMore")
+
+
+async def test_get_all_users_query_count():
+    """get_all_users must not issue one query per user"""
+    print("🧪 Testing database commands per request...")
+    await init_db()
+
+    counts = {}
+    for users in (5, 50):
+        await seed_users(users)
+        full = await commands_for(lambda: users_repo.get_all_users())
+        page = await commands_for(lambda: users_repo.get_all_users(limit=20))
+        counts[users] = (full, page)
+        print(f"  {users:>3} users: {full} commands for the full list, {page} for one page")
+
+    await cleanup()
+
+    if counts[5] == counts[50]:
+        print("✅ Command count is constant as the user count grows")
+    else:
+        print(f"❌ Command count grows with users: {counts}")
+    assert counts[5] == counts[50]
+
+
+# Most database commands each single-document read may issue on a cold cache
+ROUND_TRIP_BUDGETS = {
+    "accounts_repo.show": (lambda: accounts_repo.show(BASE_USER_ID), 1),
+    "accounts_repo.get_version_stamp": (lambda: accounts_repo.get_version_stamp(BASE_USER_ID), 1),
+    "users_repo.get_user_by_id": (lambda: users_repo.get_user_by_id(BASE_USER_ID), 1),
+    "users_repo.get_user_profile": (lambda: users_repo.get_user_profile(BASE_USER_ID), 1),
+    "users_repo.get_version_stamp": (lambda: users_repo.get_version_stamp(BASE_USER_ID), 1),
+}
+
+
+async def test_single_document_round_trip_budgets():
+    """Single-document reads must stay within their round-trip budget"""
+    print("🧪 Testing round-trip budgets for single-document reads...")
+    await init_db()
+    await seed_users(1)
+
+    over_budget = []
+    for name, (call, budget) in ROUND_TRIP_BUDGETS.items():
+        for cache in caches.values():
+            await cache.clear()
+        used = await commands_for(call)
+        print(f"  {name:<34} {used} commands (budget {budget})")
+        if used > budget:
+            over_budget.append(name)
+
+    await cleanup()
+
+    if not over_budget:
+        print("✅ Every read is within its round-trip budget")
+    else:
+        print(f"❌ Over budget: {over_budget}")
+    assert not over_budget
+
+
+if __name__ == "__main__":
+    print("🏦 Bank System - Query Count Test")
+    print("=" * 50)
+
+    try:
+        asyncio.run(test_get_all_users_query_count())
+        asyncio.run(test_single_document_round_trip_budgets())
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
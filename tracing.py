@@ -0,0 +1,290 @@
+import asyncio
+import functools
+import json
+import os
+import random
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from pymongo import monitoring
+
+from metrics import command_collection
+
+# Share of new traces recorded; requests with a traceparent follow the caller's sampled flag
+TRACE_SAMPLE_RATIO = float(os.getenv("TRACE_SAMPLE_RATIO", "0.01"))
+# "none" (default) turns tracing off, "console" prints one line per span,
+# "file" writes JSON lines to TRACE_FILE
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none")
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+# The trace file is rolled over to TRACE_FILE.1 at this size, so at most twice this is kept on disk
+TRACE_FILE_MAX_BYTES = int(os.getenv("TRACE_FILE_MAX_BYTES", str(50 * 1024 * 1024)))
+TRACE_EXPORT_INTERVAL_SECONDS = float(os.getenv("TRACE_EXPORT_INTERVAL_SECONDS", "5"))
+# Finished spans waiting for export; beyond this the oldest are dropped instead of growing memory
+TRACE_QUEUE_SIZE = int(os.getenv("TRACE_QUEUE_SIZE", "10000"))
+
+TRACEPARENT_HEADER = b"traceparent"
+
+
+class Span:
+    """A timed operation within a trace, shaped after the OpenTelemetry data model"""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns",
+                 "attributes", "status", "status_message")
+
+    def __init__(self, name: str, trace_id: str, parent_id=None, kind: str = "internal",
+                 attributes=None, start_ns=None):
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes or {}
+        self.status = "unset"
+        self.status_message = None
+
+    def child(self, name: str, kind: str = "internal", attributes=None, start_ns=None) -> "Span":
+        return Span(name, self.trace_id, self.span_id, kind, attributes, start_ns)
+
+    def record_error(self, error: BaseException):
+        self.status = "error"
+        self.status_message = f"{type(error).__name__}: {getattr(error, 'detail', error)}"
+
+    def end(self, end_ns=None):
+        self.end_ns = end_ns or time.time_ns()
+        tracer.export_queue.append(self)
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "status": {"code": self.status, "message": self.status_message},
+        }
+
+
+# The span work on this task (or driver thread) belongs to; None when the request is not sampled
+current_span: ContextVar = ContextVar("current_span", default=None)
+
+
+def parse_traceparent(value: str):
+    """(trace_id, parent_span_id, sampled) from a W3C traceparent header, or None when malformed"""
+    parts = value.strip().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or len(parts[3]) != 2:
+        return None
+    try:
+        flags = int(parts[3], 16)
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return parts[1], parts[2], bool(flags & 1)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Child span of the current span for the duration of the block; free when not sampled"""
+    parent = current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    child = parent.child(name, attributes=attributes)
+    token = current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.record_error(e)
+        raise
+    finally:
+        current_span.reset(token)
+        child.end()
+
+
+def traced(function):
+    """Decorator giving an async function its own span when the request is sampled"""
+    name = f"{function.__module__}.{function.__qualname__}"
+
+    @functools.wraps(function)
+    async def wrapper(*args, **kwargs):
+        if current_span.get() is None:
+            return await function(*args, **kwargs)
+        with span(name, **{"code.function": function.__qualname__}):
+            return await function(*args, **kwargs)
+
+    return wrapper
+
+
+class FileExporter:
+    def __init__(self, path: str = TRACE_FILE, max_bytes: int = TRACE_FILE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+
+    def export(self, spans):
+        try:
+            if os.path.getsize(self.path) >= self.max_bytes:
+                os.replace(self.path, self.path + ".1")
+        except FileNotFoundError:
+            pass
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(span.to_dict(), default=str) + "\n" for span in spans)
+
+
+class ConsoleExporter:
+    def export(self, spans):
+        for span in spans:
+            indent = "  " if span.parent_id else ""
+            print(f"🔭 {indent}{span.name} {(span.end_ns - span.start_ns) / 1e6:.2f} ms "
+                  f"trace={span.trace_id} span={span.span_id} status={span.status}")
+
+
+EXPORTERS = {"file": FileExporter, "console": ConsoleExporter}
+
+
+class Tracer:
+    """Samples requests and exports finished spans in batches from a background task.
+
+    Ending a span only appends it to a bounded deque (safe from driver
+    threads); the background task drains it every ``interval`` seconds and
+    hands the batch to the exporter on a worker thread.
+    """
+
+    def __init__(self, sample_ratio: float = TRACE_SAMPLE_RATIO, exporter: str = TRACE_EXPORTER,
+                 interval: float = TRACE_EXPORT_INTERVAL_SECONDS, queue_size: int = TRACE_QUEUE_SIZE):
+        self.sample_ratio = sample_ratio
+        self.exporter = EXPORTERS[exporter]() if exporter in EXPORTERS else None
+        self.interval = interval
+        self.export_queue = deque(maxlen=queue_size)
+        self.exported = 0
+
+    def start_request_span(self, name: str, traceparent=None, attributes=None):
+        """Root span for an incoming request, or None when it is not sampled"""
+        parent = parse_traceparent(traceparent) if traceparent else None
+        if parent is not None:
+            trace_id, parent_id, sampled = parent
+        else:
+            trace_id, parent_id = f"{random.getrandbits(128):032x}", None
+            sampled = random.random() < self.sample_ratio
+        if not sampled or self.exporter is None:
+            return None
+        return Span(name, trace_id, parent_id, "server", attributes)
+
+    async def flush(self):
+        batch = [self.export_queue.popleft() for _ in range(len(self.export_queue))]
+        if batch and self.exporter is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.exporter.export, batch)
+            self.exported += len(batch)
+
+    async def run(self):
+        """Background task exporting finished spans"""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"⚠️  Trace export failed: {e}")
+
+
+tracer = Tracer()
+
+
+class TracingMiddleware:
+    """ASGI middleware opening the root span of sampled requests.
+
+    The span continues the caller's trace when a ``traceparent`` header is
+    present and is named after the matched route template once routing is done.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for name, value in scope["headers"]:
+            if name == TRACEPARENT_HEADER:
+                traceparent = value.decode("latin-1")
+                break
+        root = tracer.start_request_span(
+            f'{scope["method"]} {scope["path"]}', traceparent,
+            {"http.method": scope["method"], "http.target": scope["path"]}
+        )
+        if root is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                root.attributes["http.status_code"] = message["status"]
+                if message["status"] >= 500:
+                    root.status = "error"
+            await send(message)
+
+        token = current_span.set(root)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            root.record_error(e)
+            raise
+        finally:
+            current_span.reset(token)
+            route = scope.get("route")
+            if getattr(route, "path", None):
+                root.name = f'{scope["method"]} {route.path}'
+                root.attributes["http.route"] = route.path
+            root.end()
+
+
+class TracingCommandListener(monitoring.CommandListener):
+    """Records each MongoDB command of a sampled request as a client span.
+
+    Motor copies the caller's context into its executor threads, so the
+    listener sees the span of the code that issued the command.
+    """
+
+    def __init__(self):
+        self._pending = {}
+
+    def started(self, event):
+        parent = current_span.get()
+        if parent is None:
+            return
+        self._pending[(event.connection_id, event.request_id)] = parent.child(
+            f"mongodb.{event.command_name}",
+            kind="client",
+            attributes={
+                "db.system": "mongodb",
+                "db.name": event.database_name,
+                "db.operation": event.command_name,
+                "db.mongodb.collection": command_collection(event.command_name, event.command),
+                "net.peer.name": str(event.connection_id[0]),
+            },
+        )
+
+    def succeeded(self, event):
+        command_span = self._pending.pop((event.connection_id, event.request_id), None)
+        if command_span is not None:
+            command_span.end(command_span.start_ns + event.duration_micros * 1000)
+
+    def failed(self, event):
+        command_span = self._pending.pop((event.connection_id, event.request_id), None)
+        if command_span is not None:
+            command_span.status = "error"
+            command_span.status_message = str(event.failure.get("errmsg", ""))
+            command_span.end(command_span.start_ns + event.duration_micros * 1000)